@@ -262,8 +262,8 @@ def generate_random_poem(model="openai/gpt-4.1"):
 
 
 @assistant()
-def generate_short_story(input, model="openai/gpt-4.1"):
-    """Generates a short story based on the input theme."""
+def generate_short_story(input, model="openai/gpt-4.1", task_id=None):
+    """Generates a short story based on the input theme. With task_id the story is streamed to the task's SSE queue."""
     instructions = """Create a short story based on the provided theme. The story should be engaging, well-structured, and include:
     - A clear beginning, middle, and end
     - Vivid characters and setting descriptions
@@ -277,7 +277,7 @@ def generate_short_story(input, model="openai/gpt-4.1"):
         {"role": "system", "content": instructions},
         {"role": "user", "content": input}
     ]
-    response = fetch_llm(model, messages)
+    response = fetch_llm(model, messages, stream=task_id is not None, task_id=task_id)
     return response
 
 
@@ -345,7 +345,7 @@ def universal_no_instructions(input, model="openai/gpt-4.1"):
 
 
 @assistant()
-def writer(input, model="openai/gpt-4.1", structured_output=True, response_format=None):
+def writer(input, model="openai/gpt-4.1", structured_output=True, response_format=None, task_id=None):
     """Generates short feel-good stories based on simple prompts."""
     instructions = """
     Jseš spisovatel krátkých povídek. Uživatel poskytne námět pro krátký příběh ve formě krátké věty, fráze nebo stručného popisu situace. Vytvoř krátký příběh, který bude splňovat tato kritéria:
@@ -366,7 +366,7 @@ def writer(input, model="openai/gpt-4.1", structured_output=True, response_forma
         {"role": "system", "content": instructions},
         {"role": "user", "content": input}
     ]
-    response = fetch_llm(model, messages, structured_output=structured_output, response_format=response_format)
+    response = fetch_llm(model, messages, structured_output=structured_output, response_format=response_format, stream=task_id is not None, task_id=task_id)
     return response
 
 
@@ -385,7 +385,7 @@ def sarcastic_tech_editor(input, model="openai/gpt-4.1"):
 
 
 @assistant()
-def writer(input, model="openai/gpt-4.1", structured_output=True, response_format=None):
+def writer(input, model="openai/gpt-4.1", structured_output=True, response_format=None, task_id=None):
     """Generates short feel-good stories based on simple prompts."""
     instructions = """
     Jseš spisovatel krátkých povídek. Uživatel poskytne námět pro krátký příběh ve formě krátké věty, fráze nebo stručného popisu situace. Vytvoř krátký příběh, který bude splňovat tato kritéria:
@@ -406,7 +406,7 @@ def writer(input, model="openai/gpt-4.1", structured_output=True, response_forma
         {"role": "system", "content": instructions},
         {"role": "user", "content": input}
     ]
-    response = fetch_llm(model, messages, structured_output=structured_output, response_format=response_format)
+    response = fetch_llm(model, messages, structured_output=structured_output, response_format=response_format, stream=task_id is not None, task_id=task_id)
     return response
 
 
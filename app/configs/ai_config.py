@@ -27,10 +27,101 @@ llm_providers = [
         "base_url": "https://generativelanguage.googleapis.com/v1beta/openai/chat/completions",
         "api_key": os.getenv('GEMINI_API_KEY'),
         "api_type": "openai"
+    },
+    {
+        # Local offline stand-in serving OpenAI style completions (see app/utils/mock_llm_provider.py),
+        # for running workflows and load tests without network or spending tokens
+        "name": "mock",
+        "base_url": "mock://mock/v1/chat/completions",
+        "api_key": "mock",
+        "api_type": "mock",
+        "mock": {
+            "latency_seconds": {"min": 0.05, "max": 0.3},
+            "latency_distribution": "uniform",
+            "completion_tokens": {"min": 20, "max": 200},
+            "tokens_per_second": 200,
+            "error_rate": 0.0,
+            "error_statuses": [429, 500, 503],
+            "seed": None
+        }
     }
 ]
 
+# HTTP connection pool settings
+# Defaults shared by all providers. A provider entry may override any of these
+# keys with its own "http" dict, e.g. {"name": "openrouter", ..., "http": {"pool_maxsize": 20}}.
+
+llm_http_settings = {
+    "pool_connections": 4,      # number of host pools cached by the session
+    "pool_maxsize": 10,         # max keep-alive connections per host
+    "keep_alive": True,
+    "connect_timeout": 10,      # seconds
+    "read_timeout": 120,        # seconds, long generations need a generous read timeout
+    "max_concurrency": 8,       # max parallel requests per provider issued by afetch_llm / fetch_llm_many
+}
+
+# LLM response cache settings
+# Opt-in cache in front of fetch_llm, identical requests (model, messages, temperature,
+# response format) are answered from memory or from disk without calling the provider.
+# fetch_llm(..., cache=True/False) overrides "enabled" per call.
+
+llm_cache_settings = {
+    "enabled": False,
+    "ttl_seconds": 7 * 24 * 3600,
+    "memory_max_entries": 256,                  # LRU eviction above this count
+    "disk_enabled": True,
+    "disk_dir": "cache/llm",                    # relative to the user data path
+    "disk_max_bytes": 50 * 1024 * 1024,         # oldest entries are evicted above this size
+}
+
+# Rate limits and retries
+# Defaults for all providers. A provider or a model entry may override them with its own
+# "rate_limits" dict, e.g. {"name": "openrouter", ..., "rate_limits": {"requests_per_minute": 20}}.
+# A model with its own "rate_limits" gets its own bucket, other models share the provider's bucket.
+# None means unlimited.
+
+llm_rate_limit_settings = {
+    "requests_per_minute": None,
+    "tokens_per_minute": None,          # prompt tokens are estimated before the call, corrected by the usage reported after it
+    "max_retries": 4,
+    "backoff_base_seconds": 1,          # delay before retry n is a random value up to base * 2^n (full jitter)
+    "backoff_max_seconds": 30,          # also caps the wait asked for by a Retry-After header
+    "retry_statuses": [408, 429, 500, 502, 503, 504],
+}
+
+# LLM call logging
+# Calls are logged by a background writer into rotating JSONL segments
+# (logs/ai_responses_<timestamp>.jsonl, optionally gzip compressed) in the user data files folder.
+
+llm_log_settings = {
+    "enabled": True,
+    "dir": "logs",                              # relative to the user data files path
+    "compress": False,                          # write .jsonl.gz segments
+    "segment_max_bytes": 5 * 1024 * 1024,       # rotate when the segment grows above this size (uncompressed)
+    "segment_max_age_seconds": 24 * 3600,       # rotate when the segment is older than this
+    "batch_size": 100,                          # max records written per batch
+    "flush_interval_seconds": 1,
+    "max_pending_records": 10000,               # records of failed batches kept for the next attempt
+}
+
+# Routing between provider endpoints
+# A model may list several "endpoints" serving it, e.g.
+#   {"name": "openai/gpt-4.1", "provider": "openrouter",
+#    "endpoints": [{"provider": "openrouter"}, {"provider": "openai", "model": "gpt-4.1"}]}
+# ("model" defaults to the model name). fetch_llm tries the endpoints ordered by their rolling
+# latency and error rate and fails over to the next one on error. Without "endpoints" the model
+# is served only by its "provider".
+
+llm_routing_settings = {
+    "window_size": 100,                 # latest calls per endpoint used for p50/p95 and error rate
+    "error_rate_penalty": 4,            # score = p95 latency * (1 + penalty * error rate)
+    "max_consecutive_failures": 3,      # endpoint is tried last after this many failures in a row ...
+    "failure_cooldown_seconds": 60,     # ... until this many seconds passed since its last failure
+    "decisions_log_size": 200,          # routing decisions kept for inspection
+}
+
 # Model Configurations 
+# Optional "aliases" list lets a model be requested by other names as well.
 
 llm_models = [
     {
@@ -51,7 +142,8 @@ llm_models = [
     },
     {
         "name": "google/gemini-2.5-flash", 
-        "provider": "openrouter"
+        "provider": "openrouter",
+        "aliases": ["gemini-2.5-flash"]
     },
     {
         "name": "google/gemini-2.5-flash-lite", 
@@ -100,5 +192,9 @@ llm_models = [
     {
         "name": "microsoft/phi-4", 
         "provider": "openrouter"
+    },
+    {
+        "name": "mock/chat", 
+        "provider": "mock"
     }
 ]
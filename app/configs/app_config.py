@@ -13,3 +13,16 @@ class APP_SETTINGS:
     USER_DATA_FILES_PATH = f"user_data/{USER_SETTINGS.USER_ID}/files"
     CUSTOM_WORKFLOWS_PATH_LIST = ["user_data", USER_SETTINGS.USER_ID, "custom_workflows"]    
     EXTERNAL_STORAGE_1_LOCAL_PATH = os.getenv("EXTERNAL_STORAGE_1_LOCAL_PATH")
+
+class JSON_DB_SETTINGS:
+    WAL_ENABLED = False             # append mutations to ".json_db/<db>.json.wal" instead of rewriting the whole file
+    WAL_COMPACT_BYTES = 1024 * 1024 # fold the log into the .json snapshot once it is bigger than this ...
+    WAL_COMPACT_RECORDS = 1000      # ... or has more records than this
+    FSYNC = False                   # fsync every log append and snapshot write (durable, slower)
+    INDENT = 2                      # indentation of the .json snapshot, None writes compact JSON
+    VALIDATE_ENTRIES = False        # validate added/updated entries against db_json_schema (needs jsonschema)
+
+class FILE_STORAGE_SETTINGS:
+    REFRESH_INTERVAL = 1.0          # seconds between checks of the folder mtimes of the /files tree index
+    PAGE_SIZE = 200                 # items per page of a folder listing in /files
+    PREVIEW_SIZE = 64 * 1024        # bytes of a file shown on its /files detail page, "load more" fetches the next ones
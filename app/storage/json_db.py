@@ -0,0 +1,680 @@
+# In-memory engine behind the json_db_* tools (app/tools/included.py).
+# Every database file gets one process-wide JsonDb handle keeping the parsed content in memory.
+# Reads are served from memory; a stat() of the file (mtime + size) detects edits made outside
+# the app, in which case the file is parsed again.
+#
+# Write-ahead log (JSON_DB_SETTINGS.WAL_ENABLED, off by default): mutations are appended as one
+# JSON line each to ".json_db/<db file name>.wal" in the database's folder and applied in memory,
+# so an insert costs O(record) I/O instead of rewriting the whole file. Once the log grows over
+# the configured threshold, a background thread compacts it: the current content is written as
+# a new snapshot (the .json file) and the log is removed. Loading reads the snapshot and replays
+# the log on top. Replaying is idempotent (inserts of existing ids are skipped), so a crash
+# between writing the snapshot and removing the log loses nothing. A log found when a database
+# is first opened (left by a crash, or written with the WAL on) is compacted right away, so the
+# .json file on disk is complete again. The hidden .json_db folder (SIDECAR_FOLDER) keeps these
+# files, the lock files and the snapshot temp files out of the user's folders; the /files
+# browser skips it.
+#
+# Concurrency: handle.lock is the write lock, an exclusive ".json_db/<db file name>.lock" file
+# lock (other processes) plus the in-process ReadWriteLock (app/storage/locks.py);
+# handle.read_lock() lets readers run in parallel. The lock files (and ".compact.lock", taken by
+# compaction) are empty and stay for the lifetime of the database: removing one while another
+# process waits on it would let two writers in. They may be deleted together with the database
+# when no process uses it. Snapshots are written to a temp file in .json_db and renamed over the .json file
+# (fsync with JSON_DB_SETTINGS.FSYNC), and serialized without holding the in-process lock: the
+# content is frozen copy-on-write (top-level dicts copied, collection lists copied by the next
+# writer, entries and db_info replaced instead of modified), the snapshot is committed when the
+# outermost write lock is released. Compaction rotates the log to "<db file>.wal.compacting",
+# serializes the frozen content without any lock while writers append to a fresh log, and then
+# swaps the snapshot in. The .wal.compacting file is next to the log.
+#
+# Primary-key index: per collection, entry id -> position counted from the end of the list.
+# New entries are prepended, so positions of existing entries never change on insert; point
+# lookups, updates and inserts are O(1), a delete only renumbers the entries newer than the
+# deleted one. Indexes are built lazily on first use and dropped whenever the data is reloaded.
+# Secondary indexes declared in db_info / db_json_schema (see app/storage/json_db_index.py)
+# follow the same lifecycle and are updated by every applied record.
+#
+# Transactions (handle.transaction()): records applied inside are kept in memory and persisted
+# together when the block ends, as one "batch" log line or one snapshot, so a crash never leaves
+# half of them on disk. An exception rolls the content back to the copy-on-write state frozen
+# at the start.
+
+import os
+import copy
+import glob
+import json
+import atexit
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.configs.app_config import JSON_DB_SETTINGS
+from app.storage.json_db_index import index_definitions, build_index
+from app.storage.json_db_schema import CompiledSchema, compile_schema
+from app.storage.locks import ReadWriteLock, FileLock
+
+SIDECAR_FOLDER = ".json_db"  # hidden folder next to the databases, holds their logs, lock and temp files
+WAL_SUFFIX = ".wal"
+COMPACTING_WAL_SUFFIX = ".wal.compacting"
+LOCK_SUFFIX = ".lock"
+SQLITE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+
+
+def _stat_path(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _write_temp_json(filepath: str, data: dict) -> str:
+    """Serializes data to a new temp file in the sidecar folder (to be renamed over filepath), returns the temp path."""
+    sidecar_dir = os.path.join(os.path.dirname(filepath), SIDECAR_FOLDER)
+    os.makedirs(sidecar_dir, exist_ok=True)
+    file_descriptor, tmp_filepath = tempfile.mkstemp(dir=sidecar_dir, prefix=os.path.basename(filepath) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=JSON_DB_SETTINGS.INDENT, ensure_ascii=False)
+            if JSON_DB_SETTINGS.FSYNC:
+                file.flush()
+                os.fsync(file.fileno())
+    except BaseException:
+        _remove_file(tmp_filepath)
+        raise
+    return tmp_filepath
+
+
+def copy_entries(entries: list) -> list:
+    """
+    Copies a list of entries for a caller: the list and each entry dict are new, values nested in
+    entries are shared with the cache. The engine replaces entries instead of changing them, so
+    these never change under the caller; callers must not change them in place either (replace
+    the value, e.g. entry["tags"] = [*entry["tags"], "new"]). Far cheaper than a deep copy, which
+    cost more than parsing the file again.
+    """
+    if not isinstance(entries, list):
+        return copy.deepcopy(entries)
+    return [dict(entry) if isinstance(entry, dict) else copy.deepcopy(entry) for entry in entries]
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _WriteLock:
+    """Context manager for write access to a JsonDb, reentrant within a thread."""
+    def __init__(self, db: "JsonDb"):
+        self._db = db
+
+    def __enter__(self):
+        self._db._acquire_write()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._db._release_write()
+
+
+class JsonDb:
+    def __init__(self, db_filepath: str):
+        self.db_filepath = db_filepath
+        self.sidecar_dir = os.path.join(os.path.dirname(db_filepath), SIDECAR_FOLDER)
+        sidecar_filepath = self._sidecar_filepath = os.path.join(self.sidecar_dir, os.path.basename(db_filepath))
+        self.wal_filepath = sidecar_filepath + WAL_SUFFIX
+        self.compacting_wal_filepath = sidecar_filepath + COMPACTING_WAL_SUFFIX
+        self.data: dict = {}
+        self.exists = False
+        self.lock = _WriteLock(self)
+        self._rw_lock = ReadWriteLock()
+        self._file_lock = FileLock(sidecar_filepath + LOCK_SUFFIX)
+        self._file_locked = False  # whether the current writer holds the file lock
+        self._file_stat: Optional[tuple] = None  # (snapshot stat, compacting log stat, log stat)
+        self._loaded = False
+        self._wal_records = 0
+        self._compacting = False
+        self._id_indexes: Dict[str, Dict[str, int]] = {}
+        self._secondary_indexes: Dict[str, dict] = {}
+        self._compiled_schema = (None, compile_schema(None))  # (db_json_schema it was compiled from, compiled)
+        self._shared_collections = set()  # collection lists shared with a frozen snapshot
+        self._snapshot_pending = False
+        self._transaction_records: Optional[list] = None  # records applied in the running transaction
+        self._snapshot_version = 0
+        self._written_version = 0
+
+    # locking
+
+    def _acquire_write(self):
+        if self._rw_lock.owned_by_current_thread():
+            self._rw_lock.acquire_write()
+            return
+        # no file lock (and no .lock file) while the database folder doesn't exist yet
+        file_locked = os.path.isdir(os.path.dirname(self.db_filepath)) and self._acquire_file_lock(self._file_lock)
+        try:
+            self._rw_lock.acquire_write()
+        except BaseException:
+            if file_locked:
+                self._file_lock.release()
+            raise
+        self._file_locked = file_locked
+
+    def _acquire_file_lock(self, file_lock: FileLock) -> bool:
+        os.makedirs(self.sidecar_dir, exist_ok=True)
+        return file_lock.acquire()
+
+    def _release_write(self):
+        if self._rw_lock.write_depth() > 1:
+            self._rw_lock.release_write()
+            return
+        # outermost release: commit a pending snapshot after letting readers in again,
+        # the file lock keeps other writers out until it is on disk
+        frozen = self._freeze() if self._snapshot_pending else None
+        file_locked = self._file_locked
+        self._snapshot_pending = False
+        self._file_locked = False
+        self._rw_lock.release_write()
+        try:
+            if frozen is not None:
+                self._commit_snapshot(*frozen)
+        finally:
+            if file_locked:
+                self._file_lock.release()
+
+    def read_lock(self):
+        """Context manager for shared read access (don't change handle.data while holding it)."""
+        return self._rw_lock.read()
+
+    def _freeze(self) -> tuple:
+        """Returns (content, version) that stays unchanged while writers go on (copy-on-write)."""
+        self._snapshot_version += 1
+        frozen = dict(self.data)
+        collections = self.data.get("collections")
+        if isinstance(collections, dict):
+            frozen["collections"] = dict(collections)
+            self._shared_collections = set(collections)
+        return frozen, self._snapshot_version
+
+    def _writable_entries(self, collection: str) -> list:
+        collections = self.data.setdefault("collections", {})
+        entries = collections.setdefault(collection, [])
+        if collection in self._shared_collections:
+            entries = collections[collection] = list(entries)
+            self._shared_collections.discard(collection)
+        return entries
+
+    def _set_updated_at(self, updated_at: str):
+        if updated_at and isinstance(self.data.get("db_info"), dict):
+            self.data["db_info"] = {**self.data["db_info"], "updated_at": updated_at}
+
+    def _commit_snapshot(self, frozen: dict, version: int):
+        """Writes a frozen snapshot and clears the logs (called holding the file lock, not the in-process lock)."""
+        try:
+            tmp_filepath = _write_temp_json(self.db_filepath, frozen)
+            if version < self._written_version:
+                _remove_file(tmp_filepath)  # a newer snapshot was committed meanwhile
+                return
+            os.replace(tmp_filepath, self.db_filepath)
+            self._written_version = version
+            _remove_file(self.wal_filepath)
+            _remove_file(self.compacting_wal_filepath)
+            self._file_stat = self._stat_files()
+            self.exists = True
+        except Exception:
+            self._loaded = False  # memory is ahead of the files, read them again on next access
+            raise
+
+    def _stat_files(self) -> tuple:
+        return (_stat_path(self.db_filepath), _stat_path(self.compacting_wal_filepath), _stat_path(self.wal_filepath))
+
+    def refresh(self):
+        """Re-reads the snapshot and the logs if they were changed outside this handle (or never loaded)."""
+        if self._loaded and self._stat_files() == self._file_stat:
+            return
+        # only reads files, the in-process lock is enough (writers refresh holding the file lock too)
+        self._rw_lock.acquire_write()
+        try:
+            for attempt in range(3):
+                file_stat = self._stat_files()
+                if self._loaded and file_stat == self._file_stat:
+                    return
+                try:
+                    self._load(file_stat)
+                    return
+                except FileNotFoundError:
+                    # another process compacted meanwhile (log renamed or removed), stat again
+                    self._loaded = False
+                    if attempt == 2:
+                        raise
+        finally:
+            self._rw_lock.release_write()
+
+    def _load(self, file_stat: tuple):
+        snapshot_stat, compacting_stat, wal_stat = file_stat
+        if snapshot_stat is None:
+            self.data = {}
+        else:
+            with open(self.db_filepath, "r", encoding="utf-8") as file:
+                self.data = json.load(file)
+        self.invalidate_indexes()
+        self._shared_collections = set()
+        self._wal_records = 0
+        for log_filepath, log_stat in ((self.compacting_wal_filepath, compacting_stat), (self.wal_filepath, wal_stat)):
+            if log_stat is not None:
+                self._wal_records += self._replay_wal(log_filepath)
+        self.exists = snapshot_stat is not None or self._wal_records > 0
+        self._file_stat = file_stat
+        self._loaded = True
+
+    def _replay_wal(self, log_filepath: str) -> int:
+        count = 0
+        with open(log_filepath, "r", encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line after a crash, everything before it is valid
+                self._apply_record(record)
+                count += 1
+        return count
+
+    def _entries(self, collection: str) -> list:
+        return self.data.get("collections", {}).get(collection, [])
+
+    # Backend interface used by the json_db_* tools (shared with SqliteJsonDb in app/storage/sqlite_db.py)
+
+    def is_empty(self) -> bool:
+        return not self.data
+
+    def get_meta(self, key: str):
+        """Returns a top-level item other than the collections, e.g. "db_info" or "db_json_schema" (live, don't modify)."""
+        return self.data.get(key)
+
+    def has_collection(self, collection: str) -> bool:
+        return collection in self.data.get("collections", {})
+
+    def collection_entries(self, collection: str) -> list:
+        """Returns the (live, don't modify) entries of a collection, newest first."""
+        return self._entries(collection)
+
+    def compiled_schema(self) -> CompiledSchema:
+        """Returns the compiled db_json_schema (see app/storage/json_db_schema.py), compiled again only when it was replaced."""
+        schema = self.data.get("db_json_schema")
+        if self._compiled_schema[0] is not schema:
+            self._compiled_schema = (schema, compile_schema(schema))
+        return self._compiled_schema[1]
+
+    def to_dict(self) -> dict:
+        """Returns a copy of the whole database, entries copied with copy_entries."""
+        data = {}
+        for key, value in self.data.items():
+            if key == "collections" and isinstance(value, dict):
+                data[key] = {name: copy_entries(entries) for name, entries in value.items()}
+            else:
+                data[key] = copy.deepcopy(value)  # db_info, db_json_schema: small
+        return data
+
+    def query(self, collection: str, **query) -> dict:
+        """Runs json_db_query arguments over a collection, see app/storage/json_db_query.py."""
+        from app.storage.json_db_query import query_collection
+        return query_collection(self, collection, **query)
+
+    def create_index(self, collection: str, field: str, index_type: str, updated_at: str = None):
+        """Declares a secondary index in db_info["indexes"] and saves the database."""
+        with self.lock:
+            db_info = dict(self.data.get("db_info") or {})
+            indexes = dict(db_info.get("indexes") or {})
+            declared = [item for item in indexes.get(collection, []) if (item if isinstance(item, str) else item.get("field")) != field]
+            indexes[collection] = declared + [{"field": field, "type": index_type}]
+            db_info["indexes"] = indexes
+            if updated_at:
+                db_info["updated_at"] = updated_at
+            self.data["db_info"] = db_info
+            self.invalidate_indexes()
+            self.save()
+
+    def id_index(self, collection: str) -> Dict[str, int]:
+        """Returns the id -> position-from-end index of a collection (built on first use)."""
+        index = self._id_indexes.get(collection)
+        if index is None:
+            entries = self._entries(collection)
+            size = len(entries)
+            index = {}
+            # oldest first, so the newest of duplicated ids wins like a front-to-back scan would
+            for position in range(size):
+                entry_id = entries[size - 1 - position].get("id")
+                if entry_id is not None:
+                    index[entry_id] = position
+            self._id_indexes[collection] = index
+        return index
+
+    def secondary_indexes(self, collection: str) -> dict:
+        """
+        Returns {field: index} of the indexes declared for a collection (built on first use).
+        Empty if none are declared or some entries lack a unique id (then queries scan).
+        """
+        indexes = self._secondary_indexes.get(collection)
+        if indexes is None:
+            entries = self._entries(collection)
+            definitions = index_definitions(self.data, collection)
+            if definitions and len(self.id_index(collection)) == len(entries):
+                indexes = {field: build_index(field, index_type, entries) for field, index_type in definitions.items()}
+            else:
+                indexes = {}
+            self._secondary_indexes[collection] = indexes
+        return indexes
+
+    def invalidate_indexes(self):
+        """Drops all indexes, e.g. after the data or index definitions were replaced."""
+        self._id_indexes = {}
+        self._secondary_indexes = {}
+
+    def find_position(self, collection: str, entry_id: str) -> Optional[int]:
+        """Returns the list position of an entry by id, None if not found."""
+        position = self.id_index(collection).get(entry_id)
+        if position is None:
+            return None
+        return len(self._entries(collection)) - 1 - position
+
+    def find(self, collection: str, entry_id: str) -> Optional[dict]:
+        """Returns the (live, don't modify) entry by id, None if not found."""
+        list_position = self.find_position(collection, entry_id)
+        return None if list_position is None else self._entries(collection)[list_position]
+
+    def _apply_record(self, record: dict) -> bool:
+        """
+        Applies one mutation record to the in-memory content, keeping the id index consistent.
+        Records:
+            {"op": "insert", "collection": str, "entry": dict, "updated_at": str}
+            {"op": "insert_many", "collection": str, "entries": [dict], "updated_at": str}  (same as inserts in list order)
+            {"op": "update", "collection": str, "id": str, "updates": dict, "updated_at": str}
+            {"op": "delete", "collection": str, "id": str, "updated_at": str}
+            {"op": "set_meta", "key": str, "value": any, "updated_at": str}  (top-level item other than collections)
+            {"op": "batch", "records": [dict]}  (a committed transaction)
+        Returns:
+            bool: True if the record changed anything.
+        """
+        op = record["op"]
+        if op == "batch":
+            changed = False
+            for batched_record in record["records"]:
+                changed = self._apply_record(batched_record) or changed
+            return changed
+        if op == "set_meta":
+            if record["key"] == "collections":
+                raise Exception("Collections can't be set as metadata.")
+            self.data[record["key"]] = record["value"]
+            if record["key"] in ("db_info", "db_json_schema"):
+                self._secondary_indexes = {}  # index declarations may have changed
+            if record["key"] != "db_info":
+                self._set_updated_at(record.get("updated_at"))
+            return True
+        collection = record["collection"]
+        secondary_indexes = self._secondary_indexes.get(collection) or {}
+        changed = False
+        if op in ("insert", "insert_many"):
+            index = self.id_index(collection)
+            entries = self._writable_entries(collection)
+            new_entries = []
+            for new_entry in ([record["entry"]] if op == "insert" else record["entries"]):
+                entry_id = new_entry.get("id")
+                if entry_id is None or entry_id not in index:
+                    if entry_id is not None:
+                        index[entry_id] = len(entries) + len(new_entries)
+                        for field, secondary_index in secondary_indexes.items():
+                            secondary_index.add(entry_id, new_entry.get(field))
+                    elif secondary_indexes:
+                        self._secondary_indexes.pop(collection)  # can't index entries without id
+                        secondary_indexes = {}
+                    new_entries.append(new_entry)
+            if new_entries:
+                new_entries.reverse()  # the last inserted entry ends up first
+                entries[:0] = new_entries
+                changed = True
+        elif op == "update":
+            list_position = self.find_position(collection, record["id"])
+            if list_position is not None:
+                entries = self._writable_entries(collection)
+                old_values = {field: entries[list_position].get(field) for field in secondary_indexes}
+                entry = entries[list_position] = {**entries[list_position], **record["updates"]}
+                if entry.get("id") != record["id"]:  # the update renamed the entry
+                    index = self.id_index(collection)
+                    index[entry.get("id")] = index.pop(record["id"])
+                for field, secondary_index in secondary_indexes.items():
+                    secondary_index.remove(record["id"], old_values[field])
+                    secondary_index.add(entry.get("id"), entry.get(field))
+                changed = True
+        elif op == "delete":
+            list_position = self.find_position(collection, record["id"])
+            if list_position is not None:
+                entries = self._writable_entries(collection)
+                for field, secondary_index in secondary_indexes.items():
+                    secondary_index.remove(record["id"], entries[list_position].get(field))
+                index = self.id_index(collection)
+                old_size = len(entries)
+                del entries[list_position]
+                del index[record["id"]]
+                for newer_position, newer_entry in enumerate(entries[:list_position]):
+                    newer_id = newer_entry.get("id")
+                    if index.get(newer_id) == old_size - 1 - newer_position:
+                        index[newer_id] -= 1
+                changed = True
+        else:
+            raise Exception(f"Unknown JSON DB log record operation: {op}")
+        if changed:
+            self._set_updated_at(record.get("updated_at"))
+        return changed
+
+    def apply(self, record: dict) -> bool:
+        """
+        Applies a mutation record (see _apply_record) and persists it: appended to the log in
+        WAL mode, otherwise by rewriting the snapshot once the outermost write lock is released.
+        Returns:
+            bool: True if the record changed anything.
+        """
+        with self.lock:
+            if self._transaction_records is not None:
+                changed = self._apply_record(record)
+                if changed:
+                    self._transaction_records.append(record)
+                return changed
+            if not JSON_DB_SETTINGS.WAL_ENABLED:
+                changed = self._apply_record(record)
+                if changed:
+                    self._snapshot_pending = True
+                return changed
+            self._append_to_log(record)
+            return self._apply_record(record)
+
+    def _append_to_log(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        os.makedirs(self.sidecar_dir, exist_ok=True)
+        with open(self.wal_filepath, "a", encoding="utf-8") as file:
+            file.write(line)
+            if JSON_DB_SETTINGS.FSYNC:
+                file.flush()
+                os.fsync(file.fileno())
+        self._wal_records += 1
+        self.exists = True
+        self._file_stat = self._stat_files()
+        self._maybe_compact()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Holds the write lock for the block, applies records in memory only and persists them together
+        at the end (rolled back if the block raises). A nested transaction joins the outer one.
+        """
+        with self.lock:
+            if self._transaction_records is not None:
+                yield self
+                return
+            self.refresh()
+            rollback_data, _ = self._freeze()
+            snapshot_pending = self._snapshot_pending
+            self._transaction_records = []
+            try:
+                yield self
+            except BaseException:
+                self.data = rollback_data
+                # the rolled back lists may still be shared with a snapshot being written
+                self._shared_collections = set(rollback_data.get("collections") or {})
+                self._snapshot_pending = snapshot_pending
+                self.invalidate_indexes()
+                raise
+            finally:
+                records, self._transaction_records = self._transaction_records, None
+            if records:
+                if JSON_DB_SETTINGS.WAL_ENABLED and not self._snapshot_pending:
+                    self._append_to_log({"op": "batch", "records": records})
+                else:
+                    self._snapshot_pending = True
+
+    def save(self, data: dict = None):
+        """
+        Writes the in-memory content (or replaces it by data) as a new snapshot and clears the logs,
+        once the outermost write lock is released.
+        """
+        with self.lock:
+            if data is not None:
+                self.data = data
+                self.invalidate_indexes()
+                self._shared_collections = set()
+            self._snapshot_pending = True
+            self._wal_records = 0
+            self.exists = True
+            self._loaded = True
+
+    def has_logs(self) -> bool:
+        """True if a log or a rotated log exists on disk, i.e. the .json snapshot alone is not complete."""
+        return bool(self._file_stat) and any(self._file_stat[1:])
+
+    def wal_size(self) -> int:
+        if not self._file_stat:
+            return 0
+        return sum(log_stat[1] for log_stat in self._file_stat[1:] if log_stat)
+
+    def _maybe_compact(self):
+        # called with self.lock held
+        if self._compacting:
+            return
+        if (self.wal_size() < JSON_DB_SETTINGS.WAL_COMPACT_BYTES
+                and self._wal_records < JSON_DB_SETTINGS.WAL_COMPACT_RECORDS):
+            return
+        self._compacting = True
+        threading.Thread(target=self.compact, name=f"json-db-compact-{os.path.basename(self.db_filepath)}", daemon=True).start()
+
+    def compact(self):
+        """Folds the logs into a new snapshot (waits for a compaction running in another thread or process)."""
+        compact_lock = FileLock(self._sidecar_filepath + ".compact" + LOCK_SUFFIX)
+        try:
+            self._acquire_file_lock(compact_lock)
+            try:
+                with self.lock:
+                    # nobody else writes snapshots now, temp files left by a killed process can go
+                    for tmp_filepath in glob.glob(glob.escape(self._sidecar_filepath) + ".*.tmp"):
+                        _remove_file(tmp_filepath)
+                    self.refresh()
+                    if os.path.exists(self.compacting_wal_filepath):
+                        # left over by a crashed compaction, fold the current log into it
+                        if os.path.exists(self.wal_filepath):
+                            with open(self.wal_filepath, "r", encoding="utf-8") as source, open(self.compacting_wal_filepath, "a", encoding="utf-8") as target:
+                                target.write(source.read())
+                            os.remove(self.wal_filepath)
+                    elif os.path.exists(self.wal_filepath):
+                        os.replace(self.wal_filepath, self.compacting_wal_filepath)
+                    else:
+                        return
+                    self._wal_records = 0
+                    self._file_stat = self._stat_files()
+                    frozen, version = self._freeze()
+                # serialize without any lock, writers append to a fresh log meanwhile
+                tmp_filepath = _write_temp_json(self.db_filepath, frozen)
+                with self.lock:
+                    self.refresh()
+                    if version < self._written_version or not os.path.exists(self.compacting_wal_filepath):
+                        _remove_file(tmp_filepath)  # a full snapshot was committed meanwhile
+                    else:
+                        os.replace(tmp_filepath, self.db_filepath)
+                        self._written_version = version
+                        _remove_file(self.compacting_wal_filepath)
+                        self._file_stat = self._stat_files()
+            finally:
+                compact_lock.release()
+        finally:
+            self._compacting = False
+
+
+_json_db_handles: Dict[str, JsonDb] = {}
+_json_db_handles_lock = threading.Lock()
+
+
+def is_sqlite_db_path(db_filepath: str) -> bool:
+    return os.path.splitext(db_filepath)[1].lower() in SQLITE_EXTENSIONS
+
+
+def get_json_db(db_filepath: str) -> JsonDb:
+    """
+    Returns the cached handle of a database file, refreshed if the file changed on disk.
+    Files with a SQLite extension (.sqlite, .sqlite3, .db) get a SqliteJsonDb handle with the same interface.
+    Args:
+        db_filepath (str): Path to the database file.
+    Returns:
+        JsonDb: Handle shared by all callers in this process. Hold handle.lock while changing handle.data
+            (also locks the file against other processes), handle.read_lock() while only reading it.
+    """
+    key = os.path.abspath(db_filepath)
+    opened = False
+    with _json_db_handles_lock:
+        handle = _json_db_handles.get(key)
+        if handle is None:
+            if is_sqlite_db_path(key):
+                from app.storage.sqlite_db import SqliteJsonDb
+                handle = SqliteJsonDb(key)
+            else:
+                handle = JsonDb(key)
+            _json_db_handles[key] = handle
+            opened = True
+    handle.refresh()
+    if opened and isinstance(handle, JsonDb) and handle.has_logs():
+        # left by a crash or written with the WAL on, fold it in so the .json file is complete
+        handle.compact()
+    return handle
+
+
+def forget_json_db(db_filepath: str):
+    """Drops the cached handle, the next access reads the file again."""
+    with _json_db_handles_lock:
+        handle = _json_db_handles.pop(os.path.abspath(db_filepath), None)
+    if handle is not None and hasattr(handle, "close"):
+        handle.close()
+
+
+def compact_json_dbs():
+    """Compacts the logs of all open databases, so the .json snapshots are complete (runs at exit)."""
+    with _json_db_handles_lock:
+        handles = list(_json_db_handles.values())
+    for handle in handles:
+        if isinstance(handle, JsonDb) and handle.has_logs():
+            handle.compact()
+
+
+def _forget_json_dbs_after_fork():
+    # a forked child inherits the handles with locks held by threads that don't exist there
+    global _json_db_handles_lock
+    _json_db_handles_lock = threading.Lock()
+    for handle in _json_db_handles.values():
+        if isinstance(handle, JsonDb):
+            handle._file_lock.forget()
+    _json_db_handles.clear()
+
+
+atexit.register(compact_json_dbs)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_json_dbs_after_fork)
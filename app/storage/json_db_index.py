@@ -0,0 +1,164 @@
+# Secondary indexes over JSON DB collection fields (see app/storage/json_db.py).
+# Declared per collection either in db_info:
+#     "db_info": {"indexes": {"entries": ["url", {"field": "publishedAt", "type": "sorted"}]}}
+# or next to the collection in db_json_schema:
+#     "db_json_schema": {"properties": {"collections": {"properties": {"entries": {"indexes": [...], ...}}}}}
+# A plain field name means a hash index. Hash indexes answer equality / $in, sorted indexes also
+# ranges. Both map values to entry ids, so they don't change when entries are prepended; the
+# handle updates them on every insert, update and delete. The query layer only uses them to pick
+# candidate entries, every candidate is still checked against the full predicate.
+
+import json
+from bisect import bisect_left, bisect_right
+
+INDEX_TYPES = ("hash", "sorted")
+
+
+def sort_key(value) -> tuple:
+    """Total order over JSON values: numbers (and booleans), then strings, then other values, missing/None last."""
+    if value is None:
+        return (3, "")
+    if isinstance(value, (int, float)):
+        return (0, value)
+    if isinstance(value, str):
+        return (1, value)
+    return (2, json.dumps(value, sort_keys=True, ensure_ascii=False))
+
+
+def _hash_key(value):
+    if isinstance(value, (dict, list)):
+        return ("__json__", json.dumps(value, sort_keys=True, ensure_ascii=False))
+    return value
+
+
+def index_definitions(data: dict, collection: str) -> dict:
+    """Returns {field: index type} declared for a collection in db_info or db_json_schema."""
+    declared = list((data.get("db_info") or {}).get("indexes", {}).get(collection, []))
+    schema = data.get("db_json_schema") or {}
+    collection_schema = schema.get("properties", {}).get("collections", {}).get("properties", {}).get(collection, {})
+    declared += collection_schema.get("indexes", []) if isinstance(collection_schema, dict) else []
+    definitions = {}
+    for item in declared:
+        field, index_type = (item, "hash") if isinstance(item, str) else (item.get("field"), item.get("type", "hash"))
+        if not field or index_type not in INDEX_TYPES:
+            raise Exception(f"Invalid index definition {item!r} for collection '{collection}', expected a field name or {{\"field\": ..., \"type\": \"hash\"|\"sorted\"}}.")
+        # a sorted index serves equality too, keep the more capable one
+        if definitions.get(field) != "sorted":
+            definitions[field] = index_type
+    return definitions
+
+
+class HashIndex:
+    def __init__(self, field: str):
+        self.field = field
+        self._ids = {}
+
+    def add(self, entry_id: str, value):
+        self._ids.setdefault(_hash_key(value), set()).add(entry_id)
+
+    def remove(self, entry_id: str, value):
+        key = _hash_key(value)
+        ids = self._ids.get(key)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._ids[key]
+
+    def equal(self, value) -> set:
+        try:
+            return set(self._ids.get(_hash_key(value), ()))
+        except TypeError:
+            return set()
+
+    def range(self, condition: dict):
+        return None  # not supported, the caller scans
+
+
+class SortedIndex:
+    def __init__(self, field: str):
+        self.field = field
+        self._keys = []
+        self._ids = []
+
+    def add(self, entry_id: str, value):
+        key = sort_key(value)
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._ids.insert(position, entry_id)
+
+    def remove(self, entry_id: str, value):
+        key = sort_key(value)
+        for position in range(bisect_left(self._keys, key), bisect_right(self._keys, key)):
+            if self._ids[position] == entry_id:
+                del self._keys[position]
+                del self._ids[position]
+                return
+
+    def equal(self, value) -> set:
+        key = sort_key(value)
+        return set(self._ids[bisect_left(self._keys, key):bisect_right(self._keys, key)])
+
+    def range(self, condition: dict):
+        """Returns ids matching $gt/$gte/$lt/$lte bounds of one type, None if the condition can't use the index."""
+        low, low_inclusive, high, high_inclusive = None, True, None, True
+        for operator, arg in condition.items():
+            if isinstance(arg, bool) or not isinstance(arg, (int, float, str)):
+                return None
+            if operator in ("$gt", "$gte"):
+                low, low_inclusive = sort_key(arg), operator == "$gte"
+            elif operator in ("$lt", "$lte"):
+                high, high_inclusive = sort_key(arg), operator == "$lte"
+        if low is None and high is None:
+            return None
+        if low is not None and high is not None and low[0] != high[0]:
+            return set()  # bounds of different types never match together
+        # comparisons only match values of the same type as the bound
+        type_tag = (low or high)[0]
+        if low is None:
+            start = bisect_left(self._keys, (type_tag,))
+        else:
+            start = bisect_left(self._keys, low) if low_inclusive else bisect_right(self._keys, low)
+        if high is None:
+            end = bisect_left(self._keys, (type_tag + 1,))
+        else:
+            end = bisect_right(self._keys, high) if high_inclusive else bisect_left(self._keys, high)
+        return set(self._ids[start:end])
+
+
+def build_index(field: str, index_type: str, entries: list):
+    index = SortedIndex(field) if index_type == "sorted" else HashIndex(field)
+    if index_type == "sorted":
+        pairs = sorted(((sort_key(entry.get(field)), entry["id"]) for entry in entries), key=lambda pair: pair[0])
+        index._keys = [key for key, _ in pairs]
+        index._ids = [entry_id for _, entry_id in pairs]
+    else:
+        for entry in entries:
+            index.add(entry["id"], entry.get(field))
+    return index
+
+
+def candidate_ids(indexes: dict, where: dict):
+    """
+    Returns the smallest set of entry ids that can match where, using the given {field: index},
+    or None if no predicate can use an index.
+    """
+    best = None
+    for field, condition in where.items():
+        index = indexes.get(field)
+        if index is None:
+            continue
+        ids = None
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            if "$eq" in condition:
+                ids = index.equal(condition["$eq"])
+            elif "$in" in condition and isinstance(condition["$in"], (list, tuple, set)):
+                ids = set()
+                for value in condition["$in"]:
+                    ids |= index.equal(value)
+            else:
+                ids = index.range(condition)
+        else:
+            ids = index.equal(condition)
+        if ids is not None and (best is None or len(ids) < len(best)):
+            best = ids
+    return best
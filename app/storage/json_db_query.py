@@ -0,0 +1,170 @@
+# Query engine over the cached JSON DB collections (see app/storage/json_db.py).
+# Filters entries by field predicates, orders them, and returns one page plus the total count.
+# Pages are addressed by offset or by an opaque cursor. A cursor points just after the last
+# returned entry: its sort value and its ordinal, a number that stays stable while new entries
+# are prepended and decreases along the collection (the position counted from the end of the
+# list for JSON files, the insert sequence for SQLite). Without order_by the collection order
+# (newest first) is kept and a cursor page is an O(limit) slice. Predicates on fields with a secondary
+# index (see app/storage/json_db_index.py) narrow the scanned entries to the index candidates.
+
+import json
+import base64
+import copy
+from bisect import bisect_left, bisect_right
+
+from app.storage.json_db import JsonDb
+from app.storage.json_db_index import sort_key, candidate_ids
+
+# where = {"field": value} for equality or {"field": {"$op": value, ...}} with these operators
+QUERY_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+}
+
+
+def entry_matches(entry: dict, where: dict) -> bool:
+    """Returns True if the entry satisfies all predicates (values of different types never match a range)."""
+    for field, condition in where.items():
+        value = entry.get(field)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for operator, arg in condition.items():
+                if operator not in QUERY_OPERATORS:
+                    raise Exception(f"Unknown query operator '{operator}' for field '{field}'.")
+                try:
+                    if not QUERY_OPERATORS[operator](value, arg):
+                        return False
+                except TypeError:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def encode_cursor(value, ordinal: int, order_by: str = None) -> str:
+    payload = json.dumps([value, ordinal, order_by or None], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def decode_cursor(cursor: str, order_by: str = None) -> tuple:
+    """Returns (value, ordinal) of a next_cursor, which must come from a query with the same order_by."""
+    try:
+        value, ordinal, cursor_order_by = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        ordinal = int(ordinal)
+    except Exception:
+        raise Exception("Invalid cursor.")
+    if cursor_order_by != (order_by or None):
+        raise Exception("Invalid cursor.")
+    return value, ordinal
+
+
+def _first_below(positions, ordinal, cursor_ordinal: int) -> int:
+    """Index of the first position whose ordinal is below the cursor's (ordinals decrease along positions)."""
+    low, high = 0, len(positions)
+    while low < high:
+        middle = (low + high) // 2
+        if ordinal(positions[middle]) < cursor_ordinal:
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def project_entry(entry: dict, fields: list = None) -> dict:
+    """Returns a copy of the entry, reduced to the given fields (plus id) if any."""
+    if not fields:
+        return copy.deepcopy(entry)
+    return {field: copy.deepcopy(entry[field]) for field in ["id", *fields] if field in entry}
+
+
+def query_collection(db: JsonDb, collection: str, where: dict = None, order_by: str = None,
+                     limit: int = None, offset: int = 0, cursor: str = None, fields: list = None) -> dict:
+    """
+    Runs a query over a collection of a loaded database (call with db.read_lock() or db.lock held).
+    Args:
+        db (JsonDb): Database handle.
+        collection (str): Collection name.
+        where (dict): Predicates, e.g. {"source": "techcrunch", "created_at": {"$gte": "2025-01-01"}}.
+        order_by (str): Field to order by, "-field" for descending; None keeps the collection order (newest first).
+        limit (int): Max number of entries returned, None for all.
+        offset (int): Number of matching entries to skip (ignored when cursor is given).
+        cursor (str): next_cursor of the previous page.
+        fields (list): Fields to return (id is always included), None for whole entries.
+    Returns:
+        dict: {"entries": [...], "total_entries": int, "next_cursor": str or None}
+    """
+    entries = db.data.get("collections", {}).get(collection, [])
+    size = len(entries)
+    scanned_positions = range(size)
+    if where:
+        ids = candidate_ids(db.secondary_indexes(collection), where)
+        if ids is not None:
+            positions = (db.find_position(collection, entry_id) for entry_id in ids)
+            scanned_positions = sorted(position for position in positions if position is not None)
+    return query_entries(entries, lambda position: size - 1 - position, where=where, order_by=order_by,
+                         limit=limit, offset=offset, cursor=cursor, fields=fields, scanned_positions=scanned_positions)
+
+
+def query_entries(entries: list, ordinal, where: dict = None, order_by: str = None, limit: int = None,
+                  offset: int = 0, cursor: str = None, fields: list = None, scanned_positions=None) -> dict:
+    """
+    Filters, orders and pages a list of entries in collection order (see query_collection for the arguments).
+    Args:
+        ordinal (callable): position -> stable ordinal of the entry, decreasing along the list.
+        scanned_positions (list or range): Ascending positions that can match where (default all).
+    """
+    offset = max(0, offset or 0)
+    cursor_key = decode_cursor(cursor, order_by) if cursor else None
+    if scanned_positions is None:
+        scanned_positions = range(len(entries))
+
+    if not order_by:
+        if where:
+            matching = [position for position in scanned_positions if entry_matches(entries[position], where)]
+        else:
+            matching = scanned_positions
+        total = len(matching)
+        first = _first_below(matching, ordinal, cursor_key[1]) if cursor_key is not None else offset
+        page = matching[first:first + limit] if limit is not None else matching[first:]
+        has_more = first + len(page) < total
+        return {
+            "entries": [project_entry(entries[position], fields) for position in page],
+            "total_entries": total,
+            "next_cursor": encode_cursor(None, ordinal(page[-1]), order_by) if has_more and len(page) else None
+        }
+
+    descending = order_by.startswith("-")
+    field = order_by.lstrip("-")
+    keyed = []
+    for position in scanned_positions:
+        entry = entries[position]
+        if not where or entry_matches(entry, where):
+            keyed.append(((sort_key(entry.get(field)), ordinal(position)), position))
+    keyed.sort(key=lambda item: item[0], reverse=descending)
+    total = len(keyed)
+    if cursor_key is not None:
+        cursor_sort_key = (sort_key(cursor_key[0]), cursor_key[1])
+        if descending:
+            # keys are in descending order, find the first one below the cursor
+            ascending_keys = [item[0] for item in reversed(keyed)]
+            first = total - bisect_left(ascending_keys, cursor_sort_key)
+        else:
+            first = bisect_right([item[0] for item in keyed], cursor_sort_key)
+    else:
+        first = offset
+    page = keyed[first:first + limit] if limit is not None else keyed[first:]
+    has_more = first + len(page) < total
+    next_cursor = None
+    if has_more and page:
+        last_key, last_position = page[-1]
+        next_cursor = encode_cursor(entries[last_position].get(field), last_key[1], order_by)
+    return {
+        "entries": [project_entry(entries[position], fields) for _, position in page],
+        "total_entries": total,
+        "next_cursor": next_cursor
+    }
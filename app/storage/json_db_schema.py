@@ -0,0 +1,85 @@
+# Compiled db_json_schema of a JSON DB (see app/storage/json_db.py).
+# The schema describes each collection under properties.collections.properties.<collection>, its
+# "items" schema the entries. Compiling walks it once and keeps per collection what the json_db_*
+# tools need on every write (which timestamp fields are required), so the write path only does dict
+# lookups. Compiled schemas are cached by the hash of the schema; handles keep theirs until their
+# db_json_schema object is replaced (handle.compiled_schema()).
+# Full JSON Schema validation of entries is opt-in (validate argument of the tools or
+# JSON_DB_SETTINGS.VALIDATE_ENTRIES) and needs the jsonschema package, imported on first use.
+
+import json
+import hashlib
+import threading
+from typing import Dict, Optional
+
+_compiled_schemas: Dict[str, "CompiledSchema"] = {}
+_compiled_schemas_lock = threading.Lock()
+
+
+class CompiledSchema:
+    def __init__(self, schema: Optional[dict]):
+        self.source = schema or {}
+        self._item_schemas: Dict[str, dict] = {}
+        self._required_timestamps: Dict[str, tuple] = {}
+        self._validators: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        collections = ((schema or {}).get("properties") or {}).get("collections") or {}
+        for collection, collection_schema in (collections.get("properties") or {}).items():
+            items = collection_schema.get("items") if isinstance(collection_schema, dict) else None
+            if not isinstance(items, dict):
+                continue
+            self._item_schemas[collection] = items
+            required = items.get("required") or []
+            self._required_timestamps[collection] = tuple(field for field in ("created_at", "updated_at") if field in required)
+
+    def required_timestamps(self, collection: str) -> tuple:
+        """Returns the timestamp fields ("created_at", "updated_at") the schema requires for entries of the collection."""
+        return self._required_timestamps.get(collection, ())
+
+    def validate_entries(self, collection: str, entries: list):
+        """Validates entries against the collection's items schema, raises an Exception listing the invalid ones."""
+        validator = self._validator(collection)
+        if validator is None:
+            return
+        problems = []
+        for entry in entries:
+            error = next(iter(validator.iter_errors(entry)), None)
+            if error is not None:
+                location = "/".join(str(part) for part in error.absolute_path)
+                problems.append(f"entry '{entry.get('id')}'{f' at {location}' if location else ''}: {error.message}")
+        if problems:
+            raise Exception(f"Entries don't match the schema of collection '{collection}': " + "; ".join(problems[:10])
+                            + (f" (and {len(problems) - 10} more)" if len(problems) > 10 else ""))
+
+    def _validator(self, collection: str):
+        items = self._item_schemas.get(collection)
+        if items is None:
+            return None
+        with self._lock:
+            validator = self._validators.get(collection)
+            if validator is None:
+                try:
+                    import jsonschema
+                except ImportError:
+                    raise Exception("Schema validation of entries requires the jsonschema package (pip install jsonschema).")
+                # "#/definitions/..." references point to the whole db schema, keep its definitions next to the items
+                item_schema = dict(items)
+                for key in ("definitions", "$defs"):
+                    if key in self.source and key not in item_schema:
+                        item_schema[key] = self.source[key]
+                validator_class = jsonschema.validators.validator_for(item_schema)
+                validator_class.check_schema(item_schema)
+                validator = self._validators[collection] = validator_class(item_schema)
+            return validator
+
+
+def compile_schema(schema: Optional[dict]) -> CompiledSchema:
+    """Returns the compiled schema, shared by all databases with the same schema."""
+    if not schema:
+        return CompiledSchema(None)
+    key = hashlib.sha1(json.dumps(schema, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    with _compiled_schemas_lock:
+        compiled = _compiled_schemas.get(key)
+        if compiled is None:
+            compiled = _compiled_schemas[key] = CompiledSchema(schema)
+        return compiled
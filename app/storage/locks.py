@@ -0,0 +1,127 @@
+# Locks for the JSON DB engine (app/storage/json_db.py).
+# ReadWriteLock: in-process, many readers or one (reentrant) writer, waiting writers go first.
+# FileLock: cross-process exclusive lock on a lock file (".json_db/<db file name>.lock" for a
+# database), flock on POSIX and msvcrt.locking on Windows. The lock file is created on first
+# acquire and never removed by the lock: another process may be waiting on the same file, and
+# deleting it would let that process lock a new, different file.
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ReadWriteLock:
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._condition:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("Write lock released by a thread that doesn't hold it")
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._condition.notify_all()
+
+    def owned_by_current_thread(self) -> bool:
+        return self._writer == threading.get_ident()
+
+    def write_depth(self) -> int:
+        """Nesting depth of the write lock held by the current thread (0 if it doesn't hold it)."""
+        return self._writer_depth if self.owned_by_current_thread() else 0
+
+    @contextmanager
+    def read(self):
+        """Shared access; a thread holding the write lock may read too."""
+        if self.owned_by_current_thread():
+            yield
+            return
+        with self._condition:
+            while self._writer is not None or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+
+class FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Acquires the lock, returns False if blocking is False and another holder has it."""
+        file = open(self.path, "a+b")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    file.close()
+                    return False
+            else:
+                while True:
+                    try:
+                        file.seek(0)
+                        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            file.close()
+                            return False
+                        time.sleep(0.01)
+        except Exception:
+            file.close()
+            raise
+        self._file = file
+        return True
+
+    def forget(self):
+        """Drops a lock inherited through fork, without unlocking it for the parent process."""
+        file, self._file = self._file, None
+        if file is not None:
+            file.close()  # a flock lock stays until the parent closes its descriptor too
+
+    def release(self):
+        file, self._file = self._file, None
+        if file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            file.close()
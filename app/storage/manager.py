@@ -1,74 +1,321 @@
 import os
+import copy
+import json
+import time
+import base64
 import hashlib
+import threading
+from bisect import bisect_right, insort
 from typing import Dict, List, Optional, Set
 from .models import FileSystemItem
+from app.configs.app_config import FILE_STORAGE_SETTINGS
+
+# A folder modified this recently may still change within the same mtime tick
+# (coarse timestamps on some file systems), so it is read again on the next refresh.
+RACY_MTIME_NS = 2 * 1_000_000_000
+
 
 class FileStorageManager:
-    def __init__(self, base_path: str, skip_folders: Optional[List[str]] = None):
+    """
+    In-memory index of the files and folders under base_path.
+    The tree is scanned once; later refreshes (at most every FILE_STORAGE_SETTINGS.REFRESH_INTERVAL
+    seconds) stat the known folders and read again only the ones whose mtime changed, i.e. where
+    entries were added, removed or renamed.
+    Items are kept by id and, per folder id (None for base_path), as the ordered list of child ids,
+    so get_item, children and ancestors don't scan the whole tree.
+    Scans only list folders; size and mtime of files are read (one stat) when list_children returns them.
+    With lazy=True a folder is read (one os.scandir) only when its children are first requested;
+    get_item reads the folders along the path given with an id not known yet, get_structure and
+    scan_directory read the rest of the tree.
+    """
+    def __init__(self, base_path: str, skip_folders: Optional[List[str]] = None, lazy: bool = False):
         self.base_path = os.path.abspath(base_path)
         # Store skip_folders as a set of lowercase names for fast lookup
         self.skip_folders: Set[str] = set(f.lower() for f in (skip_folders or []))
+        self.lazy = lazy
+        self._lock = threading.Lock()
+        self._items: Dict[str, FileSystemItem] = {}
+        self._children: Dict[Optional[str], List[str]] = {}  # folder id -> child ids, folders first, by name
+        self._folder_paths: Dict[str, str] = {}  # folder id -> absolute path
+        self._folder_mtimes: Dict[str, tuple] = {}  # read folder path -> (mtime_ns, racy)
+        self._last_refresh: Optional[float] = None
+        self._version = 0  # bumped on every change of the index
+        self._structure = None  # (version, structure) cached by get_structure()
 
     def _generate_id(self, path: str) -> str:
         """Generate a unique ID for a file/folder based on its path"""
         return hashlib.md5(path.encode()).hexdigest()[:12]
 
-    def scan_directory(self) -> Dict[str, FileSystemItem]:
-        items: Dict[str, FileSystemItem] = {}
-        folders: List[tuple] = []
-        files: List[tuple] = []
-        
-        for root, dirs, filenames in os.walk(self.base_path):
-            # Filter out skipped folders from dirs so os.walk won't descend into them
-            dirs[:] = [d for d in dirs if d.lower() not in self.skip_folders]
-            # Skip processing if current directory is a skipped folder
-            if os.path.basename(root).lower() in self.skip_folders:
+    def refresh(self, force: bool = False):
+        """Brings the index up to date with the file system (no-op within the refresh interval unless forced)."""
+        now = time.monotonic()
+        if not force and self._last_refresh is not None and now - self._last_refresh < FILE_STORAGE_SETTINGS.REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if self._last_refresh is None or not self._folder_mtimes:
+                self._scan_tree(self.base_path)
+            else:
+                # parents first, so a removed folder drops its subtree before it would be visited
+                for path in sorted(self._folder_mtimes, key=len):
+                    state = self._folder_mtimes.get(path)
+                    if state is None:
+                        continue  # removed with its parent meanwhile
+                    try:
+                        mtime_ns = os.stat(path).st_mtime_ns
+                    except OSError:
+                        if path == self.base_path:
+                            self._remove_subtree(path)
+                        continue  # the parent's scan removes it
+                    if mtime_ns != state[0] or state[1]:
+                        self._scan_tree(path)
+            self._last_refresh = time.monotonic()
+
+    def _scan_tree(self, root: str, recursive: Optional[bool] = None):
+        """Reads a folder and the new folders below it (only the folder itself in lazy mode)."""
+        if recursive is None:
+            recursive = not self.lazy
+        pending = [root]
+        while pending:
+            new_folders = self._scan_folder(pending.pop())
+            if recursive:
+                pending.extend(new_folders)
+
+    def _load_folder(self, folder_id: Optional[str]) -> bool:
+        """Reads a folder not read yet (lazy mode), returns False if there is no such folder."""
+        path = self.base_path if folder_id is None else self._folder_paths.get(folder_id)
+        if path is None:
+            return False
+        if path not in self._folder_mtimes:
+            self._scan_tree(path, recursive=False)
+        return True
+
+    def _load_all(self):
+        """Reads all folders not read yet (lazy mode)."""
+        if not self.lazy:
+            return
+        if self.base_path not in self._folder_mtimes:
+            self._scan_tree(self.base_path, recursive=True)
+        for path in [path for path in self._folder_paths.values() if path not in self._folder_mtimes]:
+            if path not in self._folder_mtimes:
+                self._scan_tree(path, recursive=True)
+
+    def _scan_folder(self, path: str) -> List[str]:
+        """Updates the items of one folder from the file system, returns its new subfolders."""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            entries: Dict[str, bool] = {}
+            with os.scandir(path) as iterator:
+                for entry in iterator:
+                    try:
+                        is_dir = entry.is_dir()  # from the directory listing, no stat on most systems
+                        # like os.walk, links to folders are neither listed nor followed
+                        if is_dir and (entry.is_symlink() or entry.name.lower() in self.skip_folders):
+                            continue
+                    except OSError:
+                        continue
+                    entries[entry.name] = is_dir
+        except OSError:
+            self._remove_subtree(path)
+            return []
+
+        parent_id = None if path == self.base_path else self._generate_id(path)
+        old_entries: Dict[str, str] = {}
+        removed_ids = []
+        for item_id in self._children.get(parent_id, ()):
+            item = self._items.get(item_id)
+            if item is not None and entries.get(item.title) == (item.type == 'folder'):
+                old_entries[item.title] = item_id
                 continue
+            if item is not None and item.type == 'folder':
+                self._remove_subtree(os.path.join(path, item.title))
+            else:
+                self._items.pop(item_id, None)
+            removed_ids.append(item_id)
 
-            # Process current directory
-            if root != self.base_path:  # Skip base directory itself
-                dir_id = self._generate_id(root)
-                parent_dir = os.path.dirname(root)
-                parent_id = self._generate_id(parent_dir) if parent_dir != self.base_path else None
-                folder_item = FileSystemItem.from_path(
-                    self.base_path, root, dir_id, parent_id
-                )
-                # Use folder name for sorting instead of full path
-                folder_name = os.path.basename(root).lower()
-                folders.append((folder_name, dir_id, folder_item))
-
-            # Process files in current directory
-            for file in filenames:
-                # Skip files inside skipped folders
-                if os.path.basename(root).lower() in self.skip_folders:
-                    continue
-                full_path = os.path.join(root, file)
-                file_id = self._generate_id(full_path)
-                parent_id = None if root == self.base_path else self._generate_id(root)
-                file_item = FileSystemItem.from_path(
-                    self.base_path, full_path, file_id, parent_id
+        # new items of the folder share one folder path string; size and mtime are read when an item is listed
+        folder_path = '' if parent_id is None else os.path.relpath(path, self.base_path).replace('\\', '/')
+        entry_ids = []
+        added_ids = []
+        new_folders = []
+        for name, is_dir in entries.items():
+            item_id = old_entries.get(name)
+            if item_id is None:
+                full_path = os.path.join(path, name)
+                item_id = self._generate_id(full_path)
+                self._items[item_id] = FileSystemItem(
+                    id=item_id,
+                    type='folder' if is_dir else 'file',
+                    title=name,
+                    folder_path=folder_path,
+                    parent_id=parent_id,
+                    is_hidden=name.startswith('.')
                 )
-                # Use filename for sorting instead of full path
-                files.append((file.lower(), file_id, file_item))
-
-        # Sort folders and files by their names
-        folders.sort(key=lambda x: x[0])
-        files.sort(key=lambda x: x[0])
-        
-        # Add folders first
-        for _, dir_id, folder_item in folders:
-            items[dir_id] = folder_item
-            
-        # Then add files
-        for _, file_id, file_item in files:
-            items[file_id] = file_item
-
-        return items
+                added_ids.append(item_id)
+                if is_dir:
+                    self._folder_paths[item_id] = full_path
+                    new_folders.append(full_path)
+            entry_ids.append(item_id)
+        self._folder_mtimes[path] = (mtime_ns, time.time_ns() - mtime_ns < RACY_MTIME_NS)
+        if parent_id is not None and parent_id in self._items:
+            self._items[parent_id].child_count = len(entry_ids)
+
+        child_ids = self._children.get(parent_id)
+        if child_ids is None or len(added_ids) + len(removed_ids) > 64:
+            self._children[parent_id] = sorted(entry_ids, key=self._sort_key)
+        else:
+            # a few changes in a big folder (e.g. a new log file), keep the sorted list
+            removed = set(removed_ids)
+            if removed:
+                child_ids[:] = [child_id for child_id in child_ids if child_id not in removed]
+            for item_id in added_ids:
+                insort(child_ids, item_id, key=self._sort_key)
+        if added_ids or removed_ids or child_ids is None:
+            self._version += 1
+        return new_folders
+
+    def _sort_key(self, item_id: str) -> tuple:
+        """Order of children: folders first, then files, each by name."""
+        item = self._items[item_id]
+        return (item.type != 'folder', item.title.lower(), item.title)
+
+    def _remove_subtree(self, folder_path: str):
+        """Drops a folder, its state and everything indexed below it."""
+        prefix = folder_path + os.sep
+        for path in [p for p in self._folder_mtimes if p == folder_path or p.startswith(prefix)]:
+            del self._folder_mtimes[path]
+            for item_id in self._children.pop(None if path == self.base_path else self._generate_id(path), ()):
+                self._items.pop(item_id, None)
+        if folder_path != self.base_path:
+            folder_id = self._generate_id(folder_path)
+            self._items.pop(folder_id, None)
+            self._folder_paths.pop(folder_id, None)
+            # unread subfolders (lazy mode) have no entries above, drop their paths too
+            for item_id in [item_id for item_id, path in self._folder_paths.items() if path.startswith(prefix)]:
+                del self._folder_paths[item_id]
+                self._items.pop(item_id, None)
+        self._version += 1
+
+    def get_item(self, item_id: str, path: Optional[str] = None) -> Optional[FileSystemItem]:
+        """
+        Returns the file or folder with the given id, None if there is none.
+        In lazy mode an item in a folder not read yet is found only with its path (file_path of the item),
+        then just the folders along it are read; an unknown id alone never scans the tree.
+        """
+        self.refresh()
+        item = self._items.get(item_id)
+        if item is None and self.lazy and path:
+            with self._lock:
+                self._load_path(path)
+                item = self._items.get(item_id)
+        return item
+
+    def _load_path(self, path: str):
+        """Reads the folders containing a path relative to base_path, from the root down (lazy mode)."""
+        parts = [part for part in path.replace('\\', '/').split('/') if part not in ('', '.')]
+        if '..' in parts:
+            return
+        self._load_folder(None)
+        folder_path = self.base_path
+        for part in parts[:-1]:
+            folder_path = os.path.join(folder_path, part)
+            folder_id = self._generate_id(folder_path)
+            if folder_id not in self._items or not self._load_folder(folder_id):
+                return
+
+    def children(self, folder_id: Optional[str] = None) -> List[FileSystemItem]:
+        """Returns the items of a folder (None for the root): folders first, then files, each sorted by name."""
+        self.refresh()
+        with self._lock:
+            self._load_folder(folder_id)
+            return [self._items[child_id] for child_id in self._children.get(folder_id, ())]
+
+    def list_children(self, folder_id: Optional[str] = None, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict:
+        """
+        Returns one page of the items of a folder, in the order of children().
+        Args:
+            folder_id (str): Folder id, None for the root.
+            limit (int): Max number of items, None for all.
+            cursor (str): next_cursor of the previous page, None for the first page.
+        Returns:
+            dict: {'items': [...], 'total': int, 'next_cursor': str or None}
+        """
+        self.refresh()
+        with self._lock:
+            self._load_folder(folder_id)
+            child_ids = self._children.get(folder_id, [])
+            # the cursor is the sort key of the last item, so the page start survives changes in the folder
+            start = bisect_right(child_ids, _decode_cursor(cursor), key=self._sort_key) if cursor else 0
+            end = len(child_ids) if limit is None else min(len(child_ids), start + max(0, limit))
+            items = [self._items[child_id] for child_id in child_ids[start:end]]
+            total = len(child_ids)
+            last_key = self._sort_key(child_ids[end - 1]) if start < end < total else None
+        # files may have been written to without changing the folder, stat the shown ones again
+        # (outside the lock), then update the index and return copies (under it)
+        stats = []
+        for item in items:
+            if item.type == 'file':
+                try:
+                    stats.append((item, os.stat(os.path.join(self.base_path, item.file_path))))
+                except OSError:
+                    pass
+        with self._lock:
+            for item, stat_result in stats:
+                item.update_stat(stat_result)
+            items = [copy.copy(item) for item in items]
+        return {
+            'items': items,
+            'total': total,
+            'next_cursor': _encode_cursor(last_key) if last_key is not None else None
+        }
+
+    def ancestors(self, item_id: str) -> List[FileSystemItem]:
+        """Returns the folders containing an item, from the top-level one down to its parent."""
+        self.refresh()
+        with self._lock:
+            ancestors = []
+            item = self._items.get(item_id)
+            while item is not None and item.parent_id:
+                item = self._items.get(item.parent_id)
+                if item is not None:
+                    ancestors.append(item)
+            ancestors.reverse()
+            return ancestors
+
+    def scan_directory(self) -> Dict[str, FileSystemItem]:
+        """Returns all items by id: folders first, then files, each sorted by name."""
+        self.refresh()
+        with self._lock:
+            self._load_all()
+            items = list(self._items.values())
+        folders = sorted((item for item in items if item.type == 'folder'), key=lambda item: (item.title.lower(), item.title))
+        files = sorted((item for item in items if item.type != 'folder'), key=lambda item: (item.title.lower(), item.title))
+        return {item.id: item for item in folders + files}
 
     def get_structure(self) -> Dict:
         """Returns a JSON-serializable structure of the file system"""
+        self.refresh()
+        with self._lock:
+            self._load_all()
+        cached = self._structure
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+        version = self._version
         items = self.scan_directory()
-        return {
+        structure = {
             'items': list(items.values()),
             'total': len(items)
         }
+        self._structure = (version, structure)
+        return structure
+
+
+def _encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        is_file, lower_name, name = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (bool(is_file), str(lower_name), str(name))
+    except Exception:
+        raise Exception("Invalid cursor.")
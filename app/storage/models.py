@@ -1,28 +1,35 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
+from operator import attrgetter
 from typing import Optional
 import os
 
-@dataclass
+@dataclass(slots=True)
 class FileSystemItem:
     id: str
     type: str  # 'file' or 'folder'
     title: str
-    file_path: str
+    folder_path: str  # relative path of the parent folder, '' in the root; one string shared by the siblings
+    parent_id: Optional[str] = None  # None for items in the root folder
+    is_hidden: bool = False
+    size: Optional[int] = None  # bytes, files only
+    mtime: Optional[float] = None  # last modification, seconds since the epoch
+    child_count: Optional[int] = None  # folders only, None until the folder was read
 
-    @classmethod
-    def from_path(cls, base_path: str, full_path: str, item_id: str, parent_id: Optional[str] = None) -> 'FileSystemItem':
-        rel_path = os.path.relpath(full_path, base_path)
-        item = cls(
-            id=item_id,
-            type='folder' if os.path.isdir(full_path) else 'file',
-            title=os.path.basename(full_path),
-            file_path=rel_path.replace('\\', '/')
-        )
-        
-        if parent_id:
-            setattr(item, 'parent', parent_id)
-            
-        if os.path.basename(full_path).startswith('.'):
-            setattr(item, 'is_hidden', True)
-            
-        return item
+    @property
+    def file_path(self) -> str:
+        """Path relative to the base folder, with '/' separators."""
+        return f"{self.folder_path}/{self.title}" if self.folder_path else self.title
+
+    def update_stat(self, stat_result: os.stat_result):
+        """Sets size (files) and mtime from a stat of the item."""
+        if self.type == 'file':
+            self.size = stat_result.st_size
+        self.mtime = stat_result.st_mtime
+
+    def to_dict(self) -> dict:
+        """JSON-serializable dict of all fields (one attrgetter call, unlike dataclasses.asdict's recursive copies)."""
+        return dict(zip(_FIELD_NAMES, _get_fields(self)))
+
+
+_FIELD_NAMES = ('id', 'type', 'title', 'file_path', 'parent_id', 'is_hidden', 'size', 'mtime', 'child_count')
+_get_fields = attrgetter(*_FIELD_NAMES)
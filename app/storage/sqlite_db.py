@@ -0,0 +1,420 @@
+# SQLite backend for the json_db_* tools (app/tools/included.py).
+# get_json_db() returns a SqliteJsonDb for database files ending with .sqlite, .sqlite3 or .db;
+# it has the same interface as JsonDb (app/storage/json_db.py), so every tool works unchanged.
+# Layout:
+#   meta(key, value, position)        top-level items other than collections (db_info, db_json_schema, ...) as JSON
+#   collections(name, position)       collection names, also the empty ones
+#   entries(seq, collection, id, doc) one row per entry, doc is the entry as JSON; seq grows with every
+#                                     insert, so the collection order (newest first) is "ORDER BY seq DESC"
+# Fields declared as indexes (json_db_create_index / db_info["indexes"]) get a generated column
+# json_extract(doc, field) plus a B-tree index on (collection, column), used by queries on that field.
+# Queries are translated to SQL where the predicates map exactly to the Python semantics of
+# app/storage/json_db_query.py; other predicates are checked in Python over an SQL pre-filtered scan.
+# handle.transaction() is one SQL transaction, writes inside it run in savepoints.
+
+import os
+import copy
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.configs.app_config import JSON_DB_SETTINGS
+from app.storage.json_db_index import index_definitions
+from app.storage.json_db_schema import CompiledSchema, compile_schema
+from app.storage.json_db_query import QUERY_OPERATORS, encode_cursor, decode_cursor, project_entry, query_entries
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL, position INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS collections (name TEXT PRIMARY KEY, position INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS entries (seq INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT NOT NULL, id TEXT, doc TEXT NOT NULL, UNIQUE (collection, id))",
+    "CREATE INDEX IF NOT EXISTS entries_collection_seq ON entries (collection, seq)",
+)
+
+_NUMBER_TYPES = "('integer', 'real', 'true', 'false')"
+
+
+def _json_path(field: str) -> str:
+    return '$."' + field.replace('"', '\\"') + '"'
+
+
+def _column_name(field: str) -> str:
+    readable = re.sub(r"\W", "_", field)[:40]
+    return f"f_{readable}_{hashlib.sha1(field.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _is_scalar(value) -> bool:
+    return value is None or isinstance(value, (bool, int, float, str))
+
+
+class SqliteJsonDb:
+    def __init__(self, db_filepath: str):
+        self.db_filepath = db_filepath
+        self.lock = threading.RLock()
+        self.exists = False
+        self._connection = None
+        self._meta = {}
+        self._meta_json = {}  # key -> JSON text of the loaded value
+        self._compiled_schema = (None, compile_schema(None))
+        self._data_version = None
+        self._index_columns = set()
+
+    # connection and metadata
+
+    def _connect(self, create: bool = False):
+        if self._connection is None:
+            if not create and not os.path.exists(self.db_filepath):
+                return None
+            connection = sqlite3.connect(self.db_filepath, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={'FULL' if JSON_DB_SETTINGS.FSYNC else 'NORMAL'}")
+            for statement in _SCHEMA:
+                connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        with self.lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._data_version = None
+
+    def read_lock(self):
+        """Same as lock, the handle shares one connection (SQLite itself isolates readers from other processes)."""
+        return self.lock
+
+    def refresh(self):
+        """Re-reads the metadata if the database was changed by another connection (PRAGMA data_version)."""
+        with self.lock:
+            connection = self._connect()
+            if connection is None:
+                self.exists, self._meta, self._index_columns = False, {}, set()
+                return
+            data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._load_meta(connection)
+            self._data_version = data_version
+
+    def _load_meta(self, connection):
+        meta, meta_json = {}, {}
+        for key, value in connection.execute("SELECT key, value FROM meta ORDER BY position"):
+            # unchanged items keep their objects, e.g. so compiled_schema() isn't compiled again
+            meta[key] = self._meta[key] if self._meta_json.get(key) == value and key in self._meta else json.loads(value)
+            meta_json[key] = value
+        self._meta, self._meta_json = meta, meta_json
+        has_collections = connection.execute("SELECT 1 FROM collections LIMIT 1").fetchone() is not None
+        self.exists = bool(self._meta) or has_collections
+        self._index_columns = {row[1] for row in connection.execute("PRAGMA table_xinfo(entries)") if row[1].startswith("f_")}
+
+    def _write(self, statements):
+        """Runs a function(connection) in one write transaction, then reloads the metadata."""
+        with self.lock:
+            connection = self._connect(create=True)
+            nested = connection.in_transaction
+            connection.execute("SAVEPOINT json_db_write" if nested else "BEGIN IMMEDIATE")
+            try:
+                result = statements(connection)
+                connection.execute("RELEASE json_db_write" if nested else "COMMIT")
+            except Exception:
+                if nested:
+                    connection.execute("ROLLBACK TO json_db_write")
+                    connection.execute("RELEASE json_db_write")
+                else:
+                    connection.execute("ROLLBACK")
+                raise
+            self._load_meta(connection)
+            self._data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+            return result
+
+    @contextmanager
+    def transaction(self):
+        """Runs the block in one SQL transaction (rolled back if the block raises), see JsonDb.transaction."""
+        with self.lock:
+            connection = self._connect(create=True)
+            if connection.in_transaction:
+                yield self
+                return
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self
+            except BaseException:
+                connection.execute("ROLLBACK")
+                self._load_meta(connection)
+                raise
+            connection.execute("COMMIT")
+            self._load_meta(connection)
+            self._data_version = connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _set_meta(self, connection, key: str, value):
+        position = connection.execute("SELECT position FROM meta WHERE key = ?", (key,)).fetchone()
+        if position is None:
+            position = connection.execute("SELECT coalesce(max(position) + 1, 0) FROM meta").fetchone()
+        connection.execute("INSERT OR REPLACE INTO meta (key, value, position) VALUES (?, ?, ?)",
+                           (key, json.dumps(value, ensure_ascii=False), position[0]))
+
+    # backend interface, see JsonDb
+
+    def is_empty(self) -> bool:
+        return not self.exists
+
+    def get_meta(self, key: str):
+        return self._meta.get(key)
+
+    def compiled_schema(self) -> CompiledSchema:
+        schema = self._meta.get("db_json_schema")
+        if self._compiled_schema[0] is not schema:
+            self._compiled_schema = (schema, compile_schema(schema))
+        return self._compiled_schema[1]
+
+    def has_collection(self, collection: str) -> bool:
+        connection = self._connect()
+        return connection is not None and connection.execute("SELECT 1 FROM collections WHERE name = ?", (collection,)).fetchone() is not None
+
+    def collection_entries(self, collection: str) -> list:
+        connection = self._connect()
+        if connection is None:
+            return []
+        rows = connection.execute("SELECT doc FROM entries WHERE collection = ? ORDER BY seq DESC", (collection,))
+        return [json.loads(doc) for doc, in rows]
+
+    def find(self, collection: str, entry_id: str):
+        connection = self._connect()
+        if connection is None:
+            return None
+        row = connection.execute("SELECT doc FROM entries WHERE collection = ? AND id = ?", (collection, entry_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            self.refresh()
+            data = copy.deepcopy(self._meta)  # meta objects are kept between reads
+            connection = self._connect()
+            if connection is None:
+                return {}
+            data["collections"] = {name: self.collection_entries(name) for name, in connection.execute("SELECT name FROM collections ORDER BY position").fetchall()}
+            return data
+
+    def save(self, data: dict = None):
+        """Replaces the whole database content by data (a dict in the JSON file format)."""
+        data = data if data is not None else self.to_dict()
+
+        def replace_all(connection):
+            connection.execute("DELETE FROM meta")
+            connection.execute("DELETE FROM collections")
+            connection.execute("DELETE FROM entries")
+            position = 0
+            for key, value in data.items():
+                if key != "collections":
+                    connection.execute("INSERT INTO meta (key, value, position) VALUES (?, ?, ?)", (key, json.dumps(value, ensure_ascii=False), position))
+                    position += 1
+            for position, (name, entries) in enumerate((data.get("collections") or {}).items()):
+                connection.execute("INSERT INTO collections (name, position) VALUES (?, ?)", (name, position))
+                # oldest first, so the newest entry gets the highest seq
+                connection.executemany("INSERT OR IGNORE INTO entries (collection, id, doc) VALUES (?, ?, ?)",
+                                       ((name, entry.get("id"), json.dumps(entry, ensure_ascii=False)) for entry in reversed(entries)))
+
+        self._write(replace_all)
+        self._ensure_index_columns()
+
+    def apply(self, record: dict) -> bool:
+        """Applies a mutation record (see JsonDb._apply_record) in one transaction."""
+        op = record["op"]
+        collection = record.get("collection")
+
+        def apply_record(connection):
+            changed = False
+            if op == "batch":
+                for batched_record in record["records"]:
+                    changed = self.apply(batched_record) or changed
+                return changed
+            if op == "set_meta":
+                if record["key"] == "collections":
+                    raise Exception("Collections can't be set as metadata.")
+                self._set_meta(connection, record["key"], record["value"])
+                if record["key"] != "db_info" and record.get("updated_at") and "db_info" in self._meta:
+                    self._set_meta(connection, "db_info", {**self._meta["db_info"], "updated_at": record["updated_at"]})
+                return True
+            if op in ("insert", "insert_many"):
+                self._add_collection(connection, collection)
+                for entry in ([record["entry"]] if op == "insert" else record["entries"]):
+                    cursor = connection.execute("INSERT OR IGNORE INTO entries (collection, id, doc) VALUES (?, ?, ?)",
+                                                (collection, entry.get("id"), json.dumps(entry, ensure_ascii=False)))
+                    changed = changed or cursor.rowcount > 0
+            elif op == "update":
+                row = connection.execute("SELECT seq, doc FROM entries WHERE collection = ? AND id = ?", (collection, record["id"])).fetchone()
+                if row is not None:
+                    entry = json.loads(row[1])
+                    entry.update(record["updates"])
+                    connection.execute("UPDATE entries SET id = ?, doc = ? WHERE seq = ?", (entry.get("id"), json.dumps(entry, ensure_ascii=False), row[0]))
+                    changed = True
+            elif op == "delete":
+                changed = connection.execute("DELETE FROM entries WHERE collection = ? AND id = ?", (collection, record["id"])).rowcount > 0
+            else:
+                raise Exception(f"Unknown JSON DB log record operation: {op}")
+            if changed and record.get("updated_at") and "db_info" in self._meta:
+                self._set_meta(connection, "db_info", {**self._meta["db_info"], "updated_at": record["updated_at"]})
+            return changed
+
+        changed = self._write(apply_record)
+        if op == "set_meta" and record["key"] in ("db_info", "db_json_schema"):
+            self._ensure_index_columns()  # index declarations may have changed
+        return changed
+
+    def _add_collection(self, connection, collection: str):
+        connection.execute("INSERT OR IGNORE INTO collections (name, position) SELECT ?, coalesce(max(position) + 1, 0) FROM collections", (collection,))
+
+    def create_index(self, collection: str, field: str, index_type: str, updated_at: str = None):
+        """Declares a secondary index in db_info["indexes"] and creates its generated column and SQL index."""
+        def declare(connection):
+            db_info = dict(self._meta.get("db_info") or {})
+            indexes = dict(db_info.get("indexes") or {})
+            declared = [item for item in indexes.get(collection, []) if (item if isinstance(item, str) else item.get("field")) != field]
+            indexes[collection] = declared + [{"field": field, "type": index_type}]
+            db_info["indexes"] = indexes
+            if updated_at:
+                db_info["updated_at"] = updated_at
+            self._set_meta(connection, "db_info", db_info)
+
+        self._write(declare)
+        self._ensure_index_columns()
+
+    def _ensure_index_columns(self):
+        with self.lock:
+            connection = self._connect()
+            if connection is None:
+                return
+            fields = set()
+            for name, in connection.execute("SELECT name FROM collections").fetchall():
+                fields.update(index_definitions(self._meta, name))
+            for field in sorted(fields):
+                column = _column_name(field)
+                if column not in self._index_columns:
+                    connection.execute(f'ALTER TABLE entries ADD COLUMN "{column}" GENERATED ALWAYS AS (json_extract(doc, \'{_json_path(field).replace(chr(39), chr(39) * 2)}\')) VIRTUAL')
+                    self._index_columns.add(column)
+                connection.execute(f'CREATE INDEX IF NOT EXISTS "ix_{column}" ON entries (collection, "{column}")')
+
+    # queries
+
+    def _field_sql(self, field: str) -> tuple:
+        """Returns (value expression, json type expression, params of each) for a field of doc."""
+        path = _json_path(field)
+        column = _column_name(field)
+        value_sql = f'"{column}"' if column in self._index_columns else "json_extract(doc, ?)"
+        value_params = () if column in self._index_columns else (path,)
+        return value_sql, value_params, "json_type(doc, ?)", (path,)
+
+    def _equal_sql(self, field: str, value) -> tuple:
+        # the value comparison comes first and stands alone in the AND, so an index on the column can serve it
+        value_sql, value_params, type_sql, type_params = self._field_sql(field)
+        if value is None:
+            return f"({value_sql} IS NULL)", value_params
+        types = "('text')" if isinstance(value, str) else _NUMBER_TYPES
+        return f"({value_sql} = ? AND {type_sql} IN {types})", (*value_params, value, *type_params)
+
+    def _where_sql(self, where: dict) -> tuple:
+        """
+        Translates where to SQL. Returns (sql, params, exact); exact is False if some predicates
+        couldn't be translated and the rows still have to be checked in Python.
+        """
+        clauses, params, exact = [], [], True
+        for field, condition in (where or {}).items():
+            if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+                for operator, arg in condition.items():
+                    if operator not in QUERY_OPERATORS:
+                        raise Exception(f"Unknown query operator '{operator}' for field '{field}'.")
+                    if operator in ("$in", "$nin"):
+                        if not isinstance(arg, (list, tuple)) or not all(_is_scalar(value) for value in arg):
+                            exact = False
+                            continue
+                        parts = [self._equal_sql(field, value) for value in arg]
+                        sql = "(" + " OR ".join(part for part, _ in parts) + ")" if parts else "0"
+                        clauses.append(sql if operator == "$in" else f"NOT coalesce({sql}, 0)")
+                        params += [param for _, part_params in parts for param in part_params]
+                    elif not _is_scalar(arg):
+                        exact = False
+                    elif operator in ("$eq", "$ne"):
+                        sql, sql_params = self._equal_sql(field, arg)
+                        clauses.append(sql if operator == "$eq" else f"NOT coalesce({sql}, 0)")
+                        params += sql_params
+                    elif arg is None:
+                        clauses.append("0")  # ranges never match None
+                    else:
+                        value_sql, value_params, type_sql, type_params = self._field_sql(field)
+                        types = "('text')" if isinstance(arg, str) else _NUMBER_TYPES
+                        sql_operator = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}[operator]
+                        clauses.append(f"({value_sql} {sql_operator} ? AND {type_sql} IN {types})")
+                        params += [*value_params, arg, *type_params]
+            elif _is_scalar(condition):
+                sql, sql_params = self._equal_sql(field, condition)
+                clauses.append(sql)
+                params += sql_params
+            else:
+                exact = False
+        return " AND ".join(clauses) or "1", params, exact
+
+    def _sort_sql(self, field: str) -> tuple:
+        """SQL (tag, value) sort key mirroring json_db_index.sort_key: numbers, strings, other, missing/None."""
+        value_sql, value_params, type_sql, type_params = self._field_sql(field)
+        tag_sql = (f"CASE WHEN {type_sql} IS NULL OR {type_sql} = 'null' THEN 3 "
+                   f"WHEN {type_sql} IN {_NUMBER_TYPES} THEN 0 WHEN {type_sql} = 'text' THEN 1 ELSE 2 END")
+        return tag_sql, (*type_params, *type_params, *type_params, *type_params), f"coalesce({value_sql}, '')", value_params
+
+    def query(self, collection: str, where: dict = None, order_by: str = None, limit: int = None,
+              offset: int = 0, cursor: str = None, fields: list = None) -> dict:
+        """Runs json_db_query arguments over a collection, in SQL where possible."""
+        with self.lock:
+            connection = self._connect()
+            if connection is None:
+                return {"entries": [], "total_entries": 0, "next_cursor": None}
+            where_sql, where_params, exact = self._where_sql(where)
+            if not exact:
+                # filter what SQL can, the rest in Python; cursors then carry the Python sort value
+                rows = connection.execute(f"SELECT seq, doc FROM entries WHERE collection = ? AND {where_sql} ORDER BY seq DESC",
+                                          (collection, *where_params)).fetchall()
+                seqs = [seq for seq, _ in rows]
+                entries = [json.loads(doc) for _, doc in rows]
+                return query_entries(entries, lambda position: seqs[position], where=where, order_by=order_by,
+                                     limit=limit, offset=offset, cursor=cursor, fields=fields)
+
+            total = connection.execute(f"SELECT count(*) FROM entries WHERE collection = ? AND {where_sql}", (collection, *where_params)).fetchone()[0]
+            cursor_key = decode_cursor(cursor, order_by) if cursor else None
+            page_sql, page_params = "", []
+            if not order_by:
+                select_sql, select_params = "seq, doc", []
+                if cursor_key is not None:
+                    page_sql, page_params = " AND seq < ?", [cursor_key[1]]
+                order_sql = "seq DESC"
+            else:
+                descending = order_by.startswith("-")
+                tag_sql, tag_params, value_sql, value_params = self._sort_sql(order_by.lstrip("-"))
+                select_sql, select_params = f"seq, doc, {tag_sql}, {value_sql}", [*tag_params, *value_params]
+                if cursor_key is not None:
+                    try:
+                        (cursor_tag, cursor_value), cursor_seq = cursor_key
+                    except (TypeError, ValueError):
+                        # ordered by the same field, but paged by the Python fallback (a where SQL can't run)
+                        raise Exception("Invalid cursor.")
+                    page_sql = f" AND ({tag_sql}, {value_sql}, seq) {'<' if descending else '>'} (?, ?, ?)"
+                    page_params = [*tag_params, *value_params, cursor_tag, cursor_value, cursor_seq]
+                direction = "DESC" if descending else "ASC"
+                order_sql = f"3 {direction}, 4 {direction}, seq {direction}"
+            offset_value = 0 if cursor_key is not None else max(0, offset or 0)
+            rows = connection.execute(
+                f"SELECT {select_sql} FROM entries WHERE collection = ? AND {where_sql}{page_sql} ORDER BY {order_sql} LIMIT ? OFFSET ?",
+                (*select_params, collection, *where_params, *page_params, -1 if limit is None else limit + 1, offset_value)
+            ).fetchall()
+            has_more = limit is not None and len(rows) > limit
+            rows = rows[:limit] if limit is not None else rows
+            next_cursor = None
+            if has_more and rows:
+                last = rows[-1]
+                next_cursor = encode_cursor(None if not order_by else [last[2], last[3]], last[0], order_by)
+            return {
+                "entries": [project_entry(json.loads(row[1]), fields) for row in rows],
+                "total_entries": total,
+                "next_cursor": next_cursor
+            }
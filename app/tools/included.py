@@ -2,13 +2,26 @@ import os
 import requests
 import json
 import re
+import time
+import asyncio
+import threading
 from pathlib import Path
 from typing import Dict, Any
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
 
 from app.tools.core import tool
-from app.configs.ai_config import llm_models, llm_providers
-from app.configs.app_config import APP_SETTINGS
-from app.utils.response_types import ResponseKey, ResponseStatus
+from app.configs.app_config import APP_SETTINGS, JSON_DB_SETTINGS
+from app.utils.response_types import ResponseKey, ResponseStatus, ResponseAction
+from app.utils.shared import put_msg_to_task_sse_queue
+from app.utils.http_client import get_http_session, get_http_timeout, get_http_settings, close_http_sessions
+from app.utils.llm_cache import llm_response_cache, llm_request_key
+from app.utils.single_flight import SingleFlight
+from app.utils.rate_limit import send_with_rate_limit_and_retry, estimate_tokens, llm_rate_limiter
+from app.utils.log_writer import llm_log_writer
+from app.utils import model_registry
+from app.utils.llm_router import llm_router
+from app.storage.json_db import get_json_db, copy_entries
 
 
 @tool(category='date_time')
@@ -30,17 +43,15 @@ def formatted_datetime(format: str = "%Y%m%d_%H%M%S") -> str:
 @tool(category='llm')
 def get_llm_model_info(model_name):
     """
-    Retrieves an AI model configuration from a list of available models by its name.
+    Retrieves an AI model configuration from the model registry by its name or alias.
     Args:
-        model_name (str): The name of the AI model to search for.
+        model_name (str): The name (or alias) of the AI model to search for.
     Returns:
-        dict or None: The model configuration dictionary if found, None otherwise. 
-        The model dictionary contains model parameters and settings.
+        Mapping: The read-only model configuration, its 'name' is always the real model name.
+    Raises:
+        Exception: If the model is not found in llm models in ai config.
     """
-    model_info = None
-    for model in llm_models:
-        if model['name'] == model_name:
-            model_info = model
+    model_info = model_registry.get_llm_registry().get_model(model_name)
     if not model_info:
         raise Exception(f"Model '{model_name}' not found in llm models in ai config")
     return model_info
@@ -53,17 +64,38 @@ def get_llm_provider_info(provider_name):
     Args:
         provider_name (str): The name of the LLM provider to search for.
     Returns:
-        dict or None: The provider's information as a dictionary if found, otherwise None.
+        Mapping: The read-only provider binding (ai config entry plus precomputed request 'headers').
+    Raises:
+        Exception: If the provider is not found in llm providers in ai config.
     """
-    provider_info = None
-    for provider in llm_providers:
-        if provider['name'] == provider_name:
-            provider_info = provider
+    provider_info = model_registry.get_llm_registry().get_provider(provider_name)
     if not provider_info:
         raise Exception(f"Provider '{provider_name}' not found in llm providers in ai config")
     return provider_info
 
 
+@tool(category='llm')
+def reload_llm_config():
+    """
+    Re-reads models and providers from app/configs/ai_config.py without restarting the server.
+    Pooled HTTP sessions and rate limit buckets are dropped so they pick up the new settings,
+    the response cache and the call log read theirs from the registry on every use.
+    """
+    registry = model_registry.reload_llm_registry()
+    close_http_sessions()
+    llm_rate_limiter.reset()
+    llm_router.reset()
+    with _provider_concurrency_lock:
+        _provider_concurrency_limits.clear()
+    return {
+        ResponseKey.STATUS: ResponseStatus.SUCCESS,
+        ResponseKey.MESSAGE: {
+            ResponseKey.TITLE: "AI config reloaded",
+            ResponseKey.BODY: f"{len(registry.models)} models, {len(registry.providers)} providers"
+        }
+    }
+
+
 @tool(category='llm')
 def format_str_as_llm_message_obj(input):
     if isinstance(input, str):
@@ -71,8 +103,12 @@ def format_str_as_llm_message_obj(input):
     return input
 
 
+# Concurrent identical LLM requests share one provider call
+llm_single_flight = SingleFlight()
+
+
 @tool()
-def fetch_llm(model_name, input, structured_output=None, response_format=None, temperature=0.6):
+def fetch_llm(model_name, input, structured_output=None, response_format=None, temperature=0.6, stream=False, task_id=None, cache=None):
     """
     Calls an LLM model by name with the given input and options.
 
@@ -82,6 +118,17 @@ def fetch_llm(model_name, input, structured_output=None, response_format=None, t
         structured_output (bool, optional): If True, requests a structured (JSON) response. Default is None.
         response_format (dict, optional): Custom response format configuration. Default is None.
         temperature (float, optional): Sampling temperature for randomness. Default is 0.6.
+        stream (bool, optional): If True, consumes the completion incrementally and forwards deltas to the task's SSE queue.
+        task_id (str, optional): Task whose SSE queue receives the streamed deltas.
+        cache (bool, optional): Use the LLM response cache for this call. Default None follows llm_cache_settings in ai config.
+            Cached responses have "cached": True in metadata.
+
+    Models with several "endpoints" in ai config are routed to the endpoint with the best rolling
+    latency and error rate, failing over to the others on error (a streamed call is not failed over
+    once its deltas reached the task, the error is raised instead).
+
+    Concurrent identical non-streamed requests are coalesced, only one provider call is made
+    and all callers receive the same result.
 
     Returns:
         dict: The response from the LLM provider, including status, data, and metadata.
@@ -93,27 +140,158 @@ def fetch_llm(model_name, input, structured_output=None, response_format=None, t
         >>> fetch_llm("gpt-4", "What is the capital of France?")
         {'status': 'success', 'data': {'content': 'The capital of France is Paris.', 'role': 'assistant'}, ...}
     """
-    model_info = get_llm_model_info(model_name)    
-    provider_info = get_llm_provider_info(provider_name=model_info['provider'])
-    
-    provider_api_key = provider_info.get('api_key')
-    provider_base_url = provider_info.get('base_url')
-    provider_api_type = provider_info.get('api_type')
-    
-    if provider_api_type == 'openai':
-        return call_api_of_type_openai_choices_direct(
-            model_name=model_info['name'],
-            api_key=provider_api_key,
-            base_url=provider_base_url,
-            input=input,
-            structured_output=structured_output,
-            response_format=response_format,
-            temperature=temperature
-            )
-    return None
+    registry = model_registry.get_llm_registry()
+    model_info = registry.get_model(model_name)
+    if not model_info:
+        raise Exception(f"Model '{model_name}' not found in llm models in ai config")
+
+    request_key = llm_request_key(model_info['name'], input, structured_output, response_format, temperature)
+    use_cache = llm_response_cache.enabled if cache is None else cache
+    if use_cache:
+        cached_response = llm_response_cache.get(request_key)
+        if cached_response:
+            return cached_response
+
+    def call_endpoint(endpoint, on_delta=None):
+        provider_info = registry.get_provider(endpoint['provider'])
+        # async callers are limited per provider actually called, which routing may pick per endpoint
+        limit = _provider_concurrency_limit(provider_info['name']) if _limit_provider_concurrency.get() else nullcontext()
+        # the mock provider speaks the openai protocol over the in-process mock:// transport
+        if provider_info.get('api_type') in ('openai', 'mock'):
+            with limit:
+                return call_api_of_type_openai_choices_direct(
+                    model_name=endpoint['model'],
+                    registry_model_name=model_info['name'],
+                    api_key=provider_info.get('api_key'),
+                    base_url=provider_info.get('base_url'),
+                    input=input,
+                    structured_output=structured_output,
+                    response_format=response_format,
+                    temperature=temperature,
+                    provider_name=provider_info['name'],
+                    stream=stream,
+                    task_id=task_id,
+                    headers=provider_info['headers'],
+                    on_delta=on_delta
+                    )
+        raise Exception(f"Provider '{provider_info['name']}' has unsupported api_type '{provider_info.get('api_type')}' in ai config")
+
+    def call_provider():
+        # endpoints ordered by rolling latency / error rate, fail over to the next one on error
+        errors = []
+        for endpoint in llm_router.order_endpoints(model_info):
+            started_at = time.monotonic()
+            deltas_emitted = []
+            try:
+                response = call_endpoint(endpoint, on_delta=deltas_emitted.append if stream and task_id else None)
+            except Exception as e:
+                llm_router.record(endpoint, time.monotonic() - started_at, ok=False)
+                if deltas_emitted:
+                    # the task already shows part of this answer, another endpoint would repeat it
+                    raise
+                errors.append((endpoint, e))
+                continue
+            llm_router.record(endpoint, time.monotonic() - started_at, ok=True)
+            return response
+        if len(errors) == 1:
+            raise errors[0][1]
+        raise Exception(f"All endpoints failed for model '{model_info['name']}': " + " | ".join(f"{endpoint['provider']}: {e}" for endpoint, e in errors))
+
+    # streamed calls deliver deltas to their own task, so they are never coalesced
+    response = call_provider() if stream else llm_single_flight.do(request_key, call_provider)
+    if use_cache and response:
+        llm_response_cache.set(request_key, response)
+    return response
+
+_provider_concurrency_limits: dict[str, threading.BoundedSemaphore] = {}
+_provider_concurrency_lock = threading.Lock()
+# set in afetch_llm worker threads, fetch_llm then holds the endpoint provider's semaphore per call
+_limit_provider_concurrency: ContextVar[bool] = ContextVar("limit_provider_concurrency", default=False)
+
+
+def _provider_concurrency_limit(provider_name: str) -> threading.BoundedSemaphore:
+    """Returns the semaphore limiting parallel async calls to one provider (max_concurrency in ai config)."""
+    with _provider_concurrency_lock:
+        semaphore = _provider_concurrency_limits.get(provider_name)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(get_http_settings(provider_name).get("max_concurrency", 8))
+            _provider_concurrency_limits[provider_name] = semaphore
+    return semaphore
+
+
+async def afetch_llm(model_name, input, structured_output=None, response_format=None, temperature=0.6, stream=False, task_id=None, cache=None):
+    """
+    Asyncio counterpart of fetch_llm, takes the same arguments and returns the same response.
+    The blocking call runs in a worker thread (sharing the pooled provider session), at most
+    max_concurrency calls per provider run at the same time.
+
+    Example:
+        >>> await afetch_llm("openai/gpt-4.1", "What is the capital of France?")
+    """
+    get_llm_model_info(model_name)
+
+    def call_limited():
+        # runs in the worker thread's copy of the context, the caller's context is untouched
+        _limit_provider_concurrency.set(True)
+        return fetch_llm(model_name, input, structured_output=structured_output, response_format=response_format,
+                             temperature=temperature, stream=stream, task_id=task_id, cache=cache)
+
+    return await asyncio.to_thread(call_limited)
+
+
+async def afetch_llm_many(requests_list, max_concurrency=None, return_exceptions=False):
+    """
+    Runs several independent fetch_llm requests concurrently.
+    Args:
+        requests_list (list[dict]): fetch_llm keyword arguments for each request, e.g. {"model_name": ..., "input": ...}.
+        max_concurrency (int, optional): Max requests in flight overall (per-provider limits still apply).
+        return_exceptions (bool): If True, failed requests return their exception instead of raising.
+    Returns:
+        list: Responses in the same order as requests_list.
+    """
+    overall_limit = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def run_one(request_kwargs):
+        if overall_limit is None:
+            return await afetch_llm(**request_kwargs)
+        async with overall_limit:
+            return await afetch_llm(**request_kwargs)
+
+    return await asyncio.gather(*(run_one(r) for r in requests_list), return_exceptions=return_exceptions)
+
+
+@tool(category='llm')
+def fetch_llm_many(requests_list, max_concurrency=None, return_exceptions=False):
+    """
+    Blocking helper for workflows and assistants: sends independent LLM requests concurrently
+    and returns the responses in input order. Must not be called from a running event loop,
+    use afetch_llm_many there instead.
+    Args:
+        requests_list (list[dict]): fetch_llm keyword arguments for each request.
+        max_concurrency (int, optional): Max requests in flight overall.
+        return_exceptions (bool): If True, failed requests return their exception instead of raising.
+    Returns:
+        list: Responses in the same order as requests_list.
+    Example:
+        >>> fetch_llm_many([
+        ...     {"model_name": "openai/gpt-4.1-mini", "input": "Translate 'cat' to Czech"},
+        ...     {"model_name": "openai/gpt-4.1-mini", "input": "Translate 'dog' to Czech"},
+        ... ], max_concurrency=2)
+    """
+    return asyncio.run(afetch_llm_many(requests_list, max_concurrency=max_concurrency, return_exceptions=return_exceptions))
+
+
+@tool(category='llm')
+def get_llm_routing_stats():
+    """
+    Returns per-endpoint latency stats (p50/p95, error rate, latency histogram)
+    and the recent routing decisions made by fetch_llm.
+    """
+    return llm_router.snapshot()
+
 
 @tool()
-def call_api_of_type_openai_choices_direct(model_name, api_key, base_url, input, structured_output=None,  response_format=None, temperature=None):
+def call_api_of_type_openai_choices_direct(model_name, api_key, base_url, input, structured_output=None,  response_format=None, temperature=None, provider_name=None, stream=False, task_id=None, headers=None, registry_model_name=None, on_delta=None):
     """
     Calls the OpenAI API with the specified model and input.
 
@@ -125,6 +303,13 @@ def call_api_of_type_openai_choices_direct(model_name, api_key, base_url, input,
         structured_output (bool, optional): If True, requests a JSON object response format.
         response_format (dict, optional): Custom response format configuration. If None and structured_output is True, defaults to JSON object format.
         temperature (float, optional): Sampling temperature for randomness (default: 0.7).
+        provider_name (str, optional): Provider name from ai config, selects the pooled keep-alive HTTP session.
+        stream (bool, optional): If True, reads the server-sent chunks as they arrive and forwards each content delta to the task's SSE queue.
+        task_id (str, optional): Task whose SSE queue receives the streamed deltas.
+        headers (Mapping, optional): Precomputed request headers from the provider binding, built from api_key if None.
+        registry_model_name (str, optional): Model name from ai config whose rate_limits apply, defaults to model_name
+            (differs from model_name on endpoints serving the model under another name).
+        on_delta (callable, optional): Called with each streamed content delta after it was forwarded.
 
     Returns:
         dict: On success, returns a dictionary with:
@@ -134,9 +319,10 @@ def call_api_of_type_openai_choices_direct(model_name, api_key, base_url, input,
         Raises Exception on error.
 
     Notes:
-        - Logs each API call and response to a timestamped file in the user data logs directory.
+        - Logs each API call and response as one JSONL record, written in the background into rotating segments in the user data logs directory.
         - Supports both plain text and structured (JSON) outputs.
         - Requires valid API key and endpoint.
+        - Requests go through the provider rate limiter, 429/5xx responses and connection errors are retried with backoff.
     """
     if not model_name:
         raise Exception("Model name for OpenAI API call was not provided")
@@ -150,7 +336,7 @@ def call_api_of_type_openai_choices_direct(model_name, api_key, base_url, input,
     if not input:
         raise Exception("Input for OpenAI API call was not provided")
     
-    headers = {
+    headers = headers or {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
@@ -164,19 +350,34 @@ def call_api_of_type_openai_choices_direct(model_name, api_key, base_url, input,
     if structured_output == True:
         if response_format == None:
             payload["response_format"] = { "type": "json_object" }
+    # turn on streaming, ask for usage in the last chunk
+    if stream:
+        payload["stream"] = True
+        payload["stream_options"] = { "include_usage": True }
 
+    response = None
     try:
-        response = requests.post(base_url, headers=headers, data=json.dumps(payload))
+        session = get_http_session(provider_name)
+        estimated_tokens = estimate_tokens(payload["messages"])
+        rate_limit_model_name = registry_model_name or model_name
+        response = send_with_rate_limit_and_retry(
+            lambda: session.post(base_url, headers=headers, data=json.dumps(payload), timeout=get_http_timeout(provider_name), stream=stream),
+            provider_name=provider_name,
+            model_name=rate_limit_model_name,
+            estimated_tokens=estimated_tokens
+        )
         if response.status_code == 200:
-            result = response.json()
-            log_timestamp = formatted_datetime("%Y%m%d_%H%M%S")
-            log_filepath = user_data_files_path(f"logs/ai_response_{log_timestamp}.log")
-            log_content = {
-                "input": format_str_as_llm_message_obj(input),
-                "output": result
-            }
-            log_content = json.dumps(log_content, ensure_ascii=False, indent=2)
-            save_to_file(content=log_content, filepath=log_filepath)
+            if stream:
+                result = read_openai_choices_stream(response, task_id=task_id, on_delta=on_delta)
+            else:
+                result = response.json()
+            llm_rate_limiter.record_usage(provider_name, rate_limit_model_name, estimated_tokens, (result.get("usage") or {}).get("total_tokens"))
+            if model_registry.get_llm_registry().log_settings.get("enabled", True):
+                llm_log_writer.write({
+                    "timestamp": current_datetime_iso(),
+                    "input": format_str_as_llm_message_obj(input),
+                    "output": result
+                })
             output = {
                 ResponseKey.STATUS: ResponseStatus.SUCCESS,
                 ResponseKey.DATA: {
@@ -195,6 +396,58 @@ def call_api_of_type_openai_choices_direct(model_name, api_key, base_url, input,
             raise Exception(f"Error returned by LLM provider: {response.status_code} - {response.text}")
     except Exception as e:
         raise Exception(f"Error calling LLM model: {e}")
+    finally:
+        if stream and response is not None:
+            response.close()
+
+
+def read_openai_choices_stream(response, task_id=None, on_delta=None):
+    """
+    Reads an OpenAI style streamed chat completion (server-sent "data: {...}" lines) chunk by chunk.
+    Each content delta is forwarded to the task's SSE queue as soon as it arrives.
+    Args:
+        response (requests.Response): Response of a request sent with stream=True.
+        task_id (str, optional): Task whose SSE queue receives the deltas.
+        on_delta (callable, optional): Called with each content delta after it was forwarded.
+    Returns:
+        dict: Assembled completion in the same shape as a non-streamed response
+            ({"model", "choices": [{"message": {...}}], "usage"}).
+    """
+    response.encoding = "utf-8"
+    content_parts = []
+    role = "assistant"
+    model = None
+    usage = None
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue # keep-alive comments (": OPENROUTER PROCESSING") and empty separators
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        if "error" in chunk:
+            raise Exception(f"Error returned by LLM provider in stream: {chunk['error']}")
+        model = chunk.get("model") or model
+        usage = chunk.get("usage") or usage
+        for choice in chunk.get("choices") or []:
+            delta = choice.get("delta") or {}
+            role = delta.get("role") or role
+            delta_content = delta.get("content")
+            if delta_content:
+                content_parts.append(delta_content)
+                if task_id:
+                    put_msg_to_task_sse_queue(
+                        task_id=task_id,
+                        message={ResponseKey.TITLE: "LLM: content delta", ResponseKey.BODY: delta_content},
+                        action=ResponseAction.CONTENT_DELTA
+                    )
+                if on_delta:
+                    on_delta(delta_content)
+    return {
+        "model": model,
+        "choices": [{"message": {"role": role, "content": "".join(content_parts)}}],
+        "usage": usage or {"prompt_tokens": None, "completion_tokens": None, "total_tokens": None}
+    }
 
 
 @tool()
@@ -236,7 +489,7 @@ def download_news_newsapi(query=None, lastDays=None, domains=None):
   }
 
   try:
-    response = requests.get(base_url, params=params)
+    response = get_http_session().get(base_url, params=params, timeout=get_http_timeout())
     if response.status_code == 200:
       return response.json()
     else:
@@ -543,17 +796,18 @@ def user_data_path(file_path: str) -> str:
 def json_db_load(db_filepath: str) -> dict:
     """
     Load JSON database from a file.
+    The parsed database is cached in memory, the file is read again only if it changed on disk.
+    SQLite databases (.sqlite, .sqlite3, .db) are returned in the same format.
     
     Args:
         filepath (str): Path to the JSON database file
     Returns:
-        dict: Database content or empty dict if file not found
+        dict: Copy of the database content or empty dict if file not found. Entries are copied
+            shallowly: replace nested values (lists, dicts) inside entries instead of changing them in place.
     """
-    try:
-        with open(db_filepath, "r", encoding="utf-8") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return {}
+    db = get_json_db(db_filepath)
+    with db.read_lock():
+        return db.to_dict()
 
 
 @tool(category='database')
@@ -571,9 +825,9 @@ def json_db_save(db_filepath: str, data: dict) -> dict:
       {"success": True, "message": "Database saved successfully."}
       {"success": False, "message": "Error saving database file: error"}
   """
+  import copy
   try:
-    with open(db_filepath, "w", encoding="utf-8") as file:
-      json.dump(data, file, indent=2, ensure_ascii=False)
+    get_json_db(db_filepath).save(copy.deepcopy(data))
     return {
       "success": True,
       "message": "Database saved successfully."
@@ -596,6 +850,7 @@ def json_db_create_db_without_schema(
    ) -> dict:
     """
     Create a new JSON database with basic structure and info, without schema validation.
+    A path ending with .sqlite, .sqlite3 or .db creates a SQLite-backed database used by the same json_db_* tools.
 
     Args:
       db_filepath (str): Path to save the new database file
@@ -619,7 +874,7 @@ def json_db_create_db_without_schema(
         {"success": False, "message": "Database file already exists."}
     """
     # Check if file already exists
-    if os.path.exists(db_filepath):
+    if get_json_db(db_filepath).exists:
         return {
           "success": False,
           "message": "Database file already exists.",
@@ -675,12 +930,11 @@ def json_db_get_entry(db_filepath: str, collection: str, entry_id: str) -> dict:
     Returns:
         dict: Entry data or None if not found
     """
-    db = json_db_load(db_filepath)
-    # return next((entry for entry in db.get(collection, []) if entry["id"] == entry_id), None)
-    for entry in db.get("collections", {}).get(collection, []):
-        if entry["id"] == entry_id:
-            return entry
-    return None
+    import copy
+    db = get_json_db(db_filepath)
+    with db.read_lock():
+        entry = db.find(collection, entry_id)
+        return copy.deepcopy(entry) if entry is not None else None
 
 
 @tool(category='database')
@@ -707,19 +961,101 @@ def json_db_get_collection(db_filepath: str, collection: str) -> dict:
             {"success": False, "message": "Database file not found."}
             {"success": False, "message": "Collection not found."}
     """
-    db = json_db_load(db_filepath)
-    if not db:
-        return {"success": False, "message": "Database file not found."}
-    
-    collection_data = db.get("collections", {}).get(collection)
-    if collection_data is None:
-        return {"success": False, "message": "Collection not found."}
+    db = get_json_db(db_filepath)
+    with db.read_lock():
+        if db.is_empty():
+            return {"success": False, "message": "Database file not found."}
+        
+        if not db.has_collection(collection):
+            return {"success": False, "message": "Collection not found."}
+        # entries copied shallowly, nested values must be replaced, not changed in place
+        collection_data = copy_entries(db.collection_entries(collection))
         
     return {"success": True, "message": "Collection retrieved successfully.", "data": {"collection_name": collection, "total_entries": len(collection_data), "entries": collection_data}}
 
 
 @tool(category='database')
-def json_db_add_entry(db_filepath: str, collection: str, entry: dict, add_createdat: bool = None, add_updatedat: bool = None) -> str:
+def json_db_query(
+   db_filepath: str,
+   collection: str,
+   where: dict = None,
+   order_by: str = None,
+   limit: int = None,
+   offset: int = 0,
+   cursor: str = None,
+   fields: list[str] = None
+   ) -> dict:
+    """
+    Query entries of a collection: filter, order and return one page with the total count.
+
+    Args:
+        db_filepath (str): Path to the database file
+        collection (str): Name of the collection to query
+        where (dict): Field predicates (optional), equality {"field": value} or operators
+            {"field": {"$gt"|"$gte"|"$lt"|"$lte"|"$eq"|"$ne"|"$in"|"$nin": value}}
+        order_by (str): Field to order by, prefixed with "-" for descending, e.g. "-created_at" (optional, default is newest first)
+        limit (int): Max number of entries to return (optional)
+        offset (int): Number of matching entries to skip (optional)
+        cursor (str): "next_cursor" from the previous page with the same order_by, continues after it (optional, replaces offset)
+        fields (list): Fields to return, "id" is always included (optional, default whole entries)
+
+    Returns:
+        dict: Response object with success status and data
+        Example:
+            {
+                "success": True,
+                "message": "Query executed successfully.",
+                "data": {
+                    "collection_name": "entries",
+                    "total_entries": 135,
+                    "entries": [...],
+                    "next_cursor": "WyIyMDI1LTA..."
+                }
+            }
+            {"success": False, "message": "Database file not found."}
+            {"success": False, "message": "Collection not found."}
+    """
+    db = get_json_db(db_filepath)
+    with db.read_lock():
+        if db.is_empty():
+            return {"success": False, "message": "Database file not found."}
+        if not db.has_collection(collection):
+            return {"success": False, "message": "Collection not found."}
+        result = db.query(collection, where=where, order_by=order_by, limit=limit, offset=offset, cursor=cursor, fields=fields)
+
+    return {"success": True, "message": "Query executed successfully.", "data": {"collection_name": collection, **result}}
+
+
+@tool(category='database')
+def json_db_create_index(db_filepath: str, collection: str, field: str, index_type: str = "hash") -> dict:
+    """
+    Declare a secondary index on a collection field (stored in db_info["indexes"]), used automatically by json_db_query.
+
+    Args:
+        db_filepath (str): Path to the database file
+        collection (str): Collection name
+        field (str): Entry field to index
+        index_type (str): "hash" for equality lookups or "sorted" for ranges and equality (optional, default "hash")
+
+    Returns:
+        dict: Response object with success status and message
+        Example:
+            {"success": True, "message": "Index created successfully.", "data": {"collection": "entries", "field": "url", "type": "hash"}}
+            {"success": False, "message": "Database file not found."}
+    """
+    if index_type not in ("hash", "sorted"):
+        raise Exception("Index type must be 'hash' or 'sorted'.")
+    db = get_json_db(db_filepath)
+    with db.lock:
+        db.refresh()
+        if db.is_empty():
+            return {"success": False, "message": "Database file not found."}
+        db.create_index(collection, field, index_type, updated_at=current_datetime_iso())
+    return {"success": True, "message": "Index created successfully.", "data": {"collection": collection, "field": field, "type": index_type}}
+
+
+@tool(category='database')
+def json_db_add_entry(db_filepath: str, collection: str, entry: dict, add_createdat: bool = None, add_updatedat: bool = None, validate: bool = None) -> str:
     """
     Add a new entry to a collection in the JSON database.
 
@@ -729,6 +1065,7 @@ def json_db_add_entry(db_filepath: str, collection: str, entry: dict, add_create
         entry (dict): Entry data to add
         add_createdat (bool): If True, adds created_at timestamp to entry (optional)
         add_updatedat (bool): If True, adds updated_at timestamp to entry (optional)
+        validate (bool): Validate the entry against db_json_schema (optional, default JSON_DB_SETTINGS.VALIDATE_ENTRIES)
 
     Returns:
         dict: Response object with success status and message
@@ -741,32 +1078,98 @@ def json_db_add_entry(db_filepath: str, collection: str, entry: dict, add_create
     Raises:
         Exception: With specific message if validation fails.
     """
-    db_data = json_db_load(db_filepath)
-    if not db_data:
-        raise Exception("Database file not found.")
+    db = get_json_db(db_filepath)
     if not collection:
         raise Exception("Collection name (str) is required.")
     if not entry:
         raise Exception("Entry (dict) is required.")
+    with db.lock:
+        db.refresh()
+        if db.is_empty():
+            raise Exception("Database file not found.")
+        schema = db.compiled_schema()
+        prepared_entry = _json_db_prepare_entry(schema.required_timestamps(collection), entry, add_createdat, add_updatedat)
+        if _json_db_validation_enabled(validate):
+            schema.validate_entries(collection, [prepared_entry])
+        entry_id = prepared_entry["id"]
+        if db.find(collection, entry_id) is not None:
+            raise Exception(f"Entry with id '{entry_id}' already exists in collection '{collection}'.")
+        db.apply({"op": "insert", "collection": collection, "entry": prepared_entry, "updated_at": current_datetime_iso()})
+
+    return {
+        ResponseKey.STATUS: ResponseStatus.SUCCESS,
+        ResponseKey.DATA: {"entry_id": entry_id},
+        ResponseKey.MESSAGE: {
+            ResponseKey.TITLE: "Entry added to JSON DB",
+            ResponseKey.BODY: f"db file path: {db_filepath}, \ncollection: {collection}, \nentry id: {entry_id}"
+        }
+    }
+
+
+@tool(category='database')
+def json_db_add_entries(db_filepath: str, collection: str, entries: list[dict], add_createdat: bool = None, add_updatedat: bool = None, validate: bool = None) -> dict:
+    """
+    Add multiple entries to a collection in the JSON database, saved with a single write.
+    The result is the same as calling json_db_add_entry for each entry in list order,
+    i.e. the last entry of the list ends up first in the collection.
+
+    Args:
+        db_filepath (str): Path to the database file
+        collection (str): Collection name
+        entries (list[dict]): Entries to add
+        add_createdat (bool): If True, adds created_at timestamp to entries (optional)
+        add_updatedat (bool): If True, adds updated_at timestamp to entries (optional)
+        validate (bool): Validate the entries against db_json_schema (optional, default JSON_DB_SETTINGS.VALIDATE_ENTRIES)
+
+    Returns:
+        dict: Response object with status, entry ids (in list order) and message.
+
+    Raises:
+        Exception: With specific message if validation fails, nothing is added in that case.
+    """
+    db = get_json_db(db_filepath)
+    if not collection:
+        raise Exception("Collection name (str) is required.")
+    if not entries or not isinstance(entries, list):
+        raise Exception("Entries (list of dicts) are required.")
+    if not all(entry and isinstance(entry, dict) for entry in entries):
+        raise Exception("Every entry must be a non-empty dict.")
+    with db.lock:
+        db.refresh()
+        if db.is_empty():
+            raise Exception("Database file not found.")
+        schema = db.compiled_schema()
+        required_timestamps = schema.required_timestamps(collection)
+        prepared_entries = [_json_db_prepare_entry(required_timestamps, entry, add_createdat, add_updatedat) for entry in entries]
+        if _json_db_validation_enabled(validate):
+            schema.validate_entries(collection, prepared_entries)
+        entry_ids = [prepared_entry["id"] for prepared_entry in prepared_entries]
+        seen_ids = set()
+        for entry_id in entry_ids:
+            if entry_id in seen_ids or db.find(collection, entry_id) is not None:
+                raise Exception(f"Entry with id '{entry_id}' already exists in collection '{collection}'.")
+            seen_ids.add(entry_id)
+        db.apply({"op": "insert_many", "collection": collection, "entries": prepared_entries, "updated_at": current_datetime_iso()})
+
+    return {
+        ResponseKey.STATUS: ResponseStatus.SUCCESS,
+        ResponseKey.DATA: {"entry_ids": entry_ids},
+        ResponseKey.MESSAGE: {
+            ResponseKey.TITLE: "Entries added to JSON DB",
+            ResponseKey.BODY: f"db file path: {db_filepath}, \ncollection: {collection}, \nentries added: {len(entry_ids)}"
+        }
+    }
 
-    if "collections" not in db_data:
-        db_data["collections"] = {}
-    if collection not in db_data["collections"]:
-        db_data["collections"][collection] = []
+
+def _json_db_prepare_entry(required_timestamps: tuple, entry: dict, add_createdat: bool = None, add_updatedat: bool = None) -> dict:
+    """Adds id and timestamps (required by schema or requested) to entry, returns the copy to be stored in the db."""
+    import copy
 
     entry_datetime = current_datetime_iso()
 
-    # Check schema for required timestamps
-    if "db_json_schema" in db_data:
-        schema = db_data["db_json_schema"]
-        if "collections" in schema.get("properties", {}):
-            collection_schema = schema["properties"]["collections"]["properties"].get(collection, {})
-            if "items" in collection_schema:
-                required_fields = collection_schema["items"].get("required", [])
-                if "created_at" in required_fields and "created_at" not in entry:
-                    entry["created_at"] = entry_datetime
-                if "updated_at" in required_fields and "updated_at" not in entry:
-                    entry["updated_at"] = entry_datetime
+    for field in required_timestamps:
+        if field not in entry:
+            entry[field] = entry_datetime
 
     entry_id = entry.get("id", generate_id())
     entry["id"] = entry_id
@@ -775,25 +1178,16 @@ def json_db_add_entry(db_filepath: str, collection: str, entry: dict, add_create
     if add_updatedat and "updated_at" not in entry:
         entry["updated_at"] = entry_datetime
 
-    db_data["collections"][collection].insert(0, entry)
+    # the cached db keeps its own copy, later changes to the caller's dict must not leak into it
+    return copy.deepcopy(entry)
 
-    if "db_info" in db_data:
-        db_data["db_info"]["updated_at"] = entry_datetime
 
-    json_db_save(db_filepath, db_data)
-
-    return {
-        ResponseKey.STATUS: ResponseStatus.SUCCESS,
-        ResponseKey.DATA: {"entry_id": entry_id},
-        ResponseKey.MESSAGE: {
-            ResponseKey.TITLE: "Entry added to JSON DB",
-            ResponseKey.BODY: f"db file path: {db_filepath}, \ncollection: {collection}, \nentry id: {entry_id}"
-        }
-    }
+def _json_db_validation_enabled(validate: bool = None) -> bool:
+    return JSON_DB_SETTINGS.VALIDATE_ENTRIES if validate is None else validate
 
 
 @tool(category='database')
-def json_db_update_entry(db_filepath: str, collection: str, entry_id: str, updates: dict) -> bool:
+def json_db_update_entry(db_filepath: str, collection: str, entry_id: str, updates: dict, validate: bool = None) -> bool:
     """
     Update an existing entry by ID in the JSON database.
     Args:
@@ -801,6 +1195,9 @@ def json_db_update_entry(db_filepath: str, collection: str, entry_id: str, updat
       collection (str): Collection name
       entry_id (str): ID of the entry to update
       updates (dict): Dictionary containing the fields and values to update
+      validate (bool): Validate the updated entry against db_json_schema (optional, default JSON_DB_SETTINGS.VALIDATE_ENTRIES)
+    Raises:
+      Exception: If updates change the id to one another entry of the collection already has.
     Returns:
       dict: Response object with success status and message
       Example:
@@ -808,30 +1205,28 @@ def json_db_update_entry(db_filepath: str, collection: str, entry_id: str, updat
         {"success": False, "message": "Database file not found."}
         {"success": False, "message": "Entry not found."}
     """
-    db = json_db_load(db_filepath)
-    if not db:
-       return {"success": False, "message": "Database file not found."}
-    for entry in db.get("collections", {}).get(collection, []):
-        if entry["id"] == entry_id:
-            entry_datetime = current_datetime_iso()
-
-            # Check schema for required timestamps
-            if "db_json_schema" in db:
-              schema = db["db_json_schema"]
-              if "collections" in schema.get("properties", {}):
-                collection_schema = schema["properties"]["collections"]["properties"].get(collection, {})
-                if "items" in collection_schema:
-                  required_fields = collection_schema["items"].get("required", [])                  
-                  if "created_at" in required_fields and "created_at" not in entry:
-                    updates["created_at"] = entry_datetime                    
-                  if "updated_at" in required_fields and "updated_at" not in entry:
-                    updates["updated_at"] = entry_datetime
-
-            entry.update(updates)
-            if "db_info" in db:
-              db["db_info"]["updated_at"] = entry_datetime
-            json_db_save(db_filepath, db)
-            return {"success": True, "message": "Entry updated successfully.", "data": {"entry_id": entry_id}}
+    import copy
+    db_handle = get_json_db(db_filepath)
+    with db_handle.lock:
+      db_handle.refresh()
+      if db_handle.is_empty():
+         return {"success": False, "message": "Database file not found."}
+      entry = db_handle.find(collection, entry_id)
+      if entry is not None:
+        # renaming onto another entry's id would leave two entries with one id
+        if "id" in updates and updates["id"] != entry_id and db_handle.find(collection, updates["id"]) is not None:
+          raise Exception(f"Entry with id '{updates['id']}' already exists in collection '{collection}'.")
+        entry_datetime = current_datetime_iso()
+
+        schema = db_handle.compiled_schema()
+        for field in schema.required_timestamps(collection):
+          if field not in entry:
+            updates[field] = entry_datetime
+        if _json_db_validation_enabled(validate):
+          schema.validate_entries(collection, [{**entry, **updates}])
+
+        db_handle.apply({"op": "update", "collection": collection, "id": entry_id, "updates": copy.deepcopy(updates), "updated_at": entry_datetime})
+        return {"success": True, "message": "Entry updated successfully.", "data": {"entry_id": entry_id}}
     return {"success": False, "message": "Entry not found."}
 
 
@@ -850,18 +1245,154 @@ def json_db_delete_entry(db_filepath: str, collection: str, entry_id: str) -> bo
         {"success": False, "message": "Database file not found."}
         {"success": False, "message": "Entry not found."}
     """
-    db = json_db_load(db_filepath)
-    db_collection = db.get("collections", {}).get(collection, [])
-    original_len = len(db_collection)
-    db["collections"][collection] = [e for e in db_collection if e["id"] != entry_id]
-    if len(db["collections"][collection]) < original_len:
-        if "db_info" in db:
-            db["db_info"]["updated_at"] = current_datetime_iso()
-        json_db_save(db_filepath, db)
-        return {"success": True, "message": "Entry deleted successfully.", "data": {"entry_id": entry_id}}
+    db_handle = get_json_db(db_filepath)
+    with db_handle.lock:
+        db_handle.refresh()
+        if db_handle.find(collection, entry_id) is not None and db_handle.apply({"op": "delete", "collection": collection, "id": entry_id, "updated_at": current_datetime_iso()}):
+            return {"success": True, "message": "Entry deleted successfully.", "data": {"entry_id": entry_id}}
     return {"success": False, "message": "Entry not found."}
 
 
+class JsonDbTransaction:
+    """
+    Reads and writes of one json_db_transaction. The methods take the arguments of the json_db_* tools
+    of the same name (without db_filepath) and return their results.
+    """
+    def __init__(self, db_filepath: str):
+        self.db_filepath = db_filepath
+
+    def get_entry(self, collection: str, entry_id: str) -> dict:
+        return json_db_get_entry(self.db_filepath, collection, entry_id)
+
+    def get_collection(self, collection: str) -> dict:
+        return json_db_get_collection(self.db_filepath, collection)
+
+    def query(self, collection: str, **query) -> dict:
+        return json_db_query(self.db_filepath, collection, **query)
+
+    def get_meta(self, key: str):
+        """Returns a copy of a top-level item other than the collections, e.g. "db_info"."""
+        import copy
+        return copy.deepcopy(get_json_db(self.db_filepath).get_meta(key))
+
+    def set_meta(self, key: str, value):
+        """Replaces a top-level item other than the collections, e.g. "db_info"."""
+        import copy
+        get_json_db(self.db_filepath).apply({"op": "set_meta", "key": key, "value": copy.deepcopy(value), "updated_at": current_datetime_iso()})
+
+    def add_entry(self, collection: str, entry: dict, add_createdat: bool = None, add_updatedat: bool = None, validate: bool = None) -> dict:
+        return json_db_add_entry(self.db_filepath, collection, entry, add_createdat, add_updatedat, validate)
+
+    def add_entries(self, collection: str, entries: list[dict], add_createdat: bool = None, add_updatedat: bool = None, validate: bool = None) -> dict:
+        return json_db_add_entries(self.db_filepath, collection, entries, add_createdat, add_updatedat, validate)
+
+    def update_entry(self, collection: str, entry_id: str, updates: dict, validate: bool = None) -> dict:
+        return json_db_update_entry(self.db_filepath, collection, entry_id, updates, validate)
+
+    def delete_entry(self, collection: str, entry_id: str) -> dict:
+        return json_db_delete_entry(self.db_filepath, collection, entry_id)
+
+
+@contextmanager
+def json_db_transaction(db_filepath: str):
+    """
+    Run several reads and writes on a database as one atomic operation.
+    The database stays locked for the whole block (also against other processes), so a
+    read-modify-write can't race with other writers. The changes are saved once when the block
+    ends and rolled back if it raises. json_db_* tools called on the same database inside the
+    block (in the same thread) join the transaction too.
+
+    Args:
+        db_filepath (str): Path to the database file
+
+    Yields:
+        JsonDbTransaction: Object with get_entry, get_collection, query, get_meta, set_meta,
+            add_entry, add_entries, update_entry and delete_entry methods
+
+    Example:
+        with json_db_transaction(db_filepath) as tx:
+            entry_id = tx.add_entry("entries", {"title": "..."})["data"]["entry_id"]
+            db_info = tx.get_meta("db_info")
+            tx.set_meta("db_info", {**db_info, "last_entry_id": entry_id})
+
+    Raises:
+        Exception: If the database file is not found.
+    """
+    db = get_json_db(db_filepath)
+    with db.lock:
+        db.refresh()
+        if db.is_empty():
+            raise Exception("Database file not found.")
+        with db.transaction():
+            yield JsonDbTransaction(db_filepath)
+
+
+@tool(category='database')
+def json_db_export(db_filepath: str, target_filepath: str, overwrite: bool = False) -> dict:
+    """
+    Export a database (e.g. a SQLite one) to a file in the JSON database format.
+    The backend of the target is chosen by its extension, so this also converts between any two backends.
+
+    Args:
+        db_filepath (str): Path to the database to export
+        target_filepath (str): Path of the exported database file, e.g. "databases/news.json"
+        overwrite (bool): Replace the target if it already exists (optional)
+
+    Returns:
+        dict: Response object with success status and message
+        Example:
+            {"success": True, "message": "Database exported successfully.", "data": {"db_path": "databases/news.json", "collections": {"entries": 250}}}
+            {"success": False, "message": "Database file not found."}
+            {"success": False, "message": "Target database file already exists."}
+    """
+    return _json_db_copy(db_filepath, target_filepath, overwrite, "exported")
+
+
+@tool(category='database')
+def json_db_import(source_filepath: str, db_filepath: str, overwrite: bool = False) -> dict:
+    """
+    Import a database file in the JSON database format into a database, e.g. to migrate news.json to news.sqlite.
+
+    Args:
+        source_filepath (str): Path to the JSON database file to import
+        db_filepath (str): Path of the database to create (backend chosen by extension: .sqlite/.sqlite3/.db or .json)
+        overwrite (bool): Replace the database if it already exists (optional)
+
+    Returns:
+        dict: Response object with success status and message
+        Example:
+            {"success": True, "message": "Database imported successfully.", "data": {"db_path": "databases/news.sqlite", "collections": {"entries": 250}}}
+            {"success": False, "message": "Database file not found."}
+            {"success": False, "message": "Target database file already exists."}
+    """
+    return _json_db_copy(source_filepath, db_filepath, overwrite, "imported")
+
+
+def _json_db_copy(source_filepath: str, target_filepath: str, overwrite: bool, action: str) -> dict:
+    if os.path.abspath(source_filepath) == os.path.abspath(target_filepath):
+        raise Exception("Source and target database files must differ.")
+    source = get_json_db(source_filepath)
+    with source.lock:
+        source.refresh()
+        if source.is_empty():
+            return {"success": False, "message": "Database file not found."}
+        data = source.to_dict()
+    target = get_json_db(target_filepath)
+    with target.lock:
+        if target.exists and not overwrite:
+            return {"success": False, "message": "Target database file already exists."}
+        os.makedirs(os.path.dirname(os.path.abspath(target_filepath)), exist_ok=True)
+        target.save(data)
+    return {
+        "success": True,
+        "message": f"Database {action} successfully.",
+        "data": {
+            "db_path": target_filepath,
+            "collections": {name: len(entries) for name, entries in data.get("collections", {}).items()}
+        }
+    }
+
+
 def brave_search(query: str, count: int = 5) -> Dict[str, Any]:
     """
     Search the web using Brave Search API.    
@@ -886,7 +1417,7 @@ def brave_search(query: str, count: int = 5) -> Dict[str, Any]:
         "text_decorations": False,
         "search_lang": "en"
     }    
-    response = requests.get(base_url, headers=headers, params=params)
+    response = get_http_session().get(base_url, headers=headers, params=params, timeout=get_http_timeout())
     response.raise_for_status()
     data = response.json()
     
@@ -917,7 +1448,7 @@ def download_web_sourcecode(url: str) -> str:
     Returns:
         str: The content of the web page
     """
-    response = requests.get(url)
+    response = get_http_session().get(url, timeout=get_http_timeout())
     response.raise_for_status()
     return response.text
 
@@ -934,7 +1465,7 @@ def download_web_readable_content(url: str, css_selector: str = None) -> str:
     """
     from bs4 import BeautifulSoup
     
-    response = requests.get(url)
+    response = get_http_session().get(url, timeout=get_http_timeout())
     response.raise_for_status()
     
     soup = BeautifulSoup(response.text, 'html.parser')
@@ -986,7 +1517,7 @@ def crawl_website_for_urls(start_url: str, url_pattern: str = None, max_pages: i
             continue
             
         try:
-            response = requests.get(current_url)
+            response = get_http_session().get(current_url, timeout=get_http_timeout())
             response.raise_for_status()
             visited_urls.add(current_url)
             
@@ -1035,7 +1566,7 @@ def extract_urls_from_pages(urls: list, css_selector: str) -> list:
     
     for url in urls:
         try:
-            response = requests.get(url)
+            response = get_http_session().get(url, timeout=get_http_timeout())
             response.raise_for_status()
             
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -1131,7 +1662,7 @@ def extract_text_from_image_mistral_ocr(file_path):
           "image_url": f"data:{mime_type};base64,{base64_encoded}"
         }
     }
-    response = requests.post(API_BASE_URL, headers=headers, json=payload)
+    response = get_http_session("mistral").post(API_BASE_URL, headers=headers, json=payload, timeout=get_http_timeout("mistral"))
     response.raise_for_status()
     result = response.json()
     return result.get("pages", [])[0].get("markdown", "")
@@ -1179,7 +1710,7 @@ def extract_text_from_image_openai(file_path, model=None):
         "temperature": 0,
         "max_tokens": 4096
     }
-    response = requests.post(API_BASE_URL, headers=headers, json=payload)
+    response = get_http_session("openai").post(API_BASE_URL, headers=headers, json=payload, timeout=get_http_timeout("openai"))
     response.raise_for_status()
     result = response.json()
     return result["choices"][0]["message"]["content"]
@@ -0,0 +1,74 @@
+# Pooled HTTP sessions for outgoing requests.
+# Each LLM provider (see llm_providers in app/configs/ai_config.py) gets its own
+# requests.Session with a keep-alive connection pool, so consecutive calls to the
+# same host reuse a warm TCP+TLS connection instead of paying a new handshake.
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.utils import model_registry
+from app.utils.mock_llm_provider import MockLLMAdapter, MOCK_URL_SCHEME
+
+# Session used for everything that is not an LLM provider (news api, scrapers, ...)
+DEFAULT_SESSION_NAME = "web"
+
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_http_settings(session_name: str = None) -> dict:
+    """Returns the HTTP settings for a session, provider overrides applied on top of the defaults."""
+    registry = model_registry.get_llm_registry()
+    settings = dict(registry.http_settings)
+    provider = registry.get_provider(session_name)
+    if provider:
+        settings.update(provider.get('http') or {})
+    return settings
+
+
+def get_http_timeout(session_name: str = None) -> tuple:
+    """Returns the (connect, read) timeout tuple to pass to session requests."""
+    settings = get_http_settings(session_name)
+    return (settings.get("connect_timeout"), settings.get("read_timeout"))
+
+
+def _create_session(session_name: str) -> requests.Session:
+    settings = get_http_settings(session_name)
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings.get("pool_connections", 4),
+        pool_maxsize=settings.get("pool_maxsize", 10)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.mount(MOCK_URL_SCHEME, MockLLMAdapter())
+    session.headers["Connection"] = "keep-alive" if settings.get("keep_alive", True) else "close"
+    return session
+
+
+def get_http_session(session_name: str = None) -> requests.Session:
+    """
+    Returns the shared pooled session for the given provider name (created on first use).
+    Args:
+        session_name (str): LLM provider name from ai config, or None for the generic web session.
+    Returns:
+        requests.Session: Session reused by all calls with the same name.
+    """
+    session_name = session_name or DEFAULT_SESSION_NAME
+    session = _sessions.get(session_name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(session_name)
+            if session is None:
+                session = _create_session(session_name)
+                _sessions[session_name] = session
+    return session
+
+
+def close_http_sessions():
+    """Closes all pooled sessions, e.g. after ai config was changed."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
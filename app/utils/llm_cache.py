@@ -0,0 +1,194 @@
+# Content-addressed cache for LLM responses.
+# Requests are keyed by a hash of the normalized request (model, messages, temperature,
+# structured output / response format). Entries live in an in-memory LRU tier and
+# optionally in an on-disk tier under the user data folder, both with a TTL.
+# The shared llm_response_cache reads llm_cache_settings through the model registry on every
+# use, so reload_llm_config() applies changed settings.
+
+import os
+import json
+import time
+import copy
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from app.utils import model_registry
+from app.configs.app_config import APP_SETTINGS
+from app.utils.response_types import ResponseKey
+
+
+def llm_request_key(model_name, input, structured_output=None, response_format=None, temperature=None) -> str:
+    """Returns a stable hash identifying an LLM request."""
+    messages = [{"role": "user", "content": input}] if isinstance(input, str) else input
+    normalized = {
+        "model": model_name,
+        "messages": messages,
+        "structured_output": bool(structured_output),
+        "response_format": response_format,
+        "temperature": temperature
+    }
+    serialized = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, settings: dict = None):
+        self._fixed_settings = settings  # None: llm_cache_settings of the current registry
+        self._memory: OrderedDict[str, tuple] = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._disk_size = None  # (disk path, bytes in the disk tier), counted on the first write and kept up to date after
+        self._disk_lock = threading.Lock()
+
+    def _settings(self):
+        return self._fixed_settings if self._fixed_settings is not None else model_registry.get_llm_registry().cache_settings
+
+    @property
+    def enabled(self) -> bool:
+        return self._settings().get("enabled", False)
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._settings().get("ttl_seconds", 7 * 24 * 3600)
+
+    @property
+    def memory_max_entries(self) -> int:
+        return self._settings().get("memory_max_entries", 256)
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self._settings().get("disk_enabled", True)
+
+    @property
+    def disk_path(self) -> str:
+        return os.path.join(APP_SETTINGS.USER_DATA_PATH, self._settings().get("disk_dir", "cache/llm"))
+
+    @property
+    def disk_max_bytes(self) -> int:
+        return self._settings().get("disk_max_bytes", 50 * 1024 * 1024)
+
+    def _disk_filepath(self, key: str) -> str:
+        return os.path.join(self.disk_path, f"{key}.json")
+
+    def _mark_cached(self, response: dict) -> dict:
+        response = copy.deepcopy(response)
+        response.setdefault(ResponseKey.METADATA, {})["cached"] = True
+        return response
+
+    def get(self, key: str):
+        """Returns the cached response (flagged as cached in metadata) or None."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached:
+                expires_at, response = cached
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return self._mark_cached(response)
+                del self._memory[key]
+        if not self.disk_enabled:
+            return None
+        filepath = self._disk_filepath(key)
+        try:
+            with open(filepath, "r", encoding="utf-8") as file:
+                disk_entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if disk_entry.get("expires_at", 0) <= now:
+            self._remove_disk_file(filepath)
+            return None
+        self._set_memory(key, disk_entry["expires_at"], disk_entry["response"])
+        return self._mark_cached(disk_entry["response"])
+
+    def set(self, key: str, response: dict):
+        """Stores a response in both tiers."""
+        expires_at = time.time() + self.ttl_seconds
+        self._set_memory(key, expires_at, copy.deepcopy(response))
+        if self.disk_enabled:
+            disk_path = self.disk_path
+            os.makedirs(disk_path, exist_ok=True)
+            filepath = os.path.join(disk_path, f"{key}.json")
+            # unique temp file, concurrent writes of the same key each replace the entry with a complete file
+            file_descriptor, tmp_filepath = tempfile.mkstemp(dir=disk_path, prefix=f"{key}.", suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                    json.dump({"expires_at": expires_at, "response": response}, file, ensure_ascii=False)
+                size = os.path.getsize(tmp_filepath)
+                try:
+                    old_size = os.path.getsize(filepath)
+                except FileNotFoundError:
+                    old_size = 0
+                os.replace(tmp_filepath, filepath)
+            except BaseException:
+                self._remove_disk_file(tmp_filepath)
+                raise
+            with self._disk_lock:
+                if self._disk_size is None or self._disk_size[0] != disk_path:
+                    self._disk_size = (disk_path, self._scan_disk(disk_path)[1])
+                else:
+                    self._disk_size = (disk_path, self._disk_size[1] + size - old_size)
+                over_limit = self._disk_size[1] > self.disk_max_bytes
+            if over_limit:
+                self._evict_disk(disk_path)
+
+    def clear(self):
+        """Removes all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        if os.path.isdir(self.disk_path):
+            for entry in os.scandir(self.disk_path):
+                if entry.name.endswith(".json"):
+                    self._remove_disk_file(entry.path)
+        with self._disk_lock:
+            self._disk_size = None
+
+    def _set_memory(self, key: str, expires_at: float, response: dict):
+        with self._lock:
+            self._memory[key] = (expires_at, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_max_entries:
+                self._memory.popitem(last=False)
+
+    def _scan_disk(self, disk_path: str) -> tuple:
+        """Returns ([(mtime, size, path)], total size) of the disk tier entries."""
+        entries = []
+        total_size = 0
+        for entry in os.scandir(disk_path):
+            if not entry.name.endswith(".json"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+        return entries, total_size
+
+    def _evict_disk(self, disk_path: str):
+        """
+        Drops expired entries, then the least recently written ones until the size is 10% below the limit.
+        Scans the folder, so it only runs when the tracked size of the disk tier is over the limit; the
+        margin keeps the next writes from scanning again right away.
+        """
+        with self._disk_lock:
+            now = time.time()
+            entries, total_size = self._scan_disk(disk_path)
+            if total_size > self.disk_max_bytes:
+                target_size = self.disk_max_bytes * 0.9
+                entries.sort()
+                for mtime, size, path in entries:
+                    if total_size <= target_size and mtime + self.ttl_seconds > now:
+                        break
+                    self._remove_disk_file(path)
+                    total_size -= size
+            self._disk_size = (disk_path, total_size)
+
+    def _remove_disk_file(self, filepath: str):
+        try:
+            os.remove(filepath)
+        except FileNotFoundError:
+            pass
+
+
+llm_response_cache = LLMResponseCache()
@@ -0,0 +1,139 @@
+# Latency-based routing and failover between provider endpoints serving one model.
+# Every call records its latency and outcome per endpoint (provider + model name at that
+# provider) in a rolling window. Endpoints are ordered by p95 latency penalized by error rate;
+# endpoints failing repeatedly are moved to the end for a cooldown period. Stats, latency
+# histograms and recent routing decisions are available through snapshot().
+
+import time
+import threading
+from collections import deque
+
+from app.utils import model_registry
+
+# Upper bounds (seconds) of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60)
+
+
+def _percentile(sorted_values: list, percent: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class EndpointStats:
+    def __init__(self, window_size: int):
+        self.calls = deque(maxlen=window_size)  # (latency_seconds, ok)
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total_calls = 0
+        self.total_errors = 0
+        self.consecutive_failures = 0
+        self.last_failure_at = None
+
+    def record(self, latency: float, ok: bool):
+        self.calls.append((latency, ok))
+        self.total_calls += 1
+        if ok:
+            self.consecutive_failures = 0
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+            self.histogram[bucket] += 1
+        else:
+            self.total_errors += 1
+            self.consecutive_failures += 1
+            self.last_failure_at = time.time()
+
+    def summary(self) -> dict:
+        latencies = sorted(latency for latency, ok in self.calls if ok)
+        errors = sum(1 for _, ok in self.calls if not ok)
+        return {
+            "samples": len(self.calls),
+            "p50": _percentile(latencies, 50) if latencies else None,
+            "p95": _percentile(latencies, 95) if latencies else None,
+            "error_rate": errors / len(self.calls) if self.calls else 0.0,
+            "consecutive_failures": self.consecutive_failures,
+            "last_failure_at": self.last_failure_at,
+            "total_calls": self.total_calls,
+            "total_errors": self.total_errors,
+            "latency_histogram": {
+                **{f"<={bound}s": count for bound, count in zip(LATENCY_BUCKETS, self.histogram)},
+                f">{LATENCY_BUCKETS[-1]}s": self.histogram[-1]
+            }
+        }
+
+
+def endpoint_key(endpoint) -> str:
+    return f"{endpoint['provider']}:{endpoint['model']}"
+
+
+class LLMRouter:
+    def __init__(self):
+        self._stats: dict[str, EndpointStats] = {}
+        self._decisions = None
+        self._lock = threading.Lock()
+
+    def _settings(self):
+        return model_registry.get_llm_registry().routing_settings
+
+    def _endpoint_stats(self, key: str) -> EndpointStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = EndpointStats(self._settings().get("window_size", 100))
+            self._stats[key] = stats
+        return stats
+
+    def order_endpoints(self, model) -> list:
+        """
+        Returns the model's endpoints, best first. Endpoints without any samples score 0 so each
+        of them is tried (and measured) early; ties keep the order from ai config.
+        """
+        endpoints = list(model["endpoints"])
+        if len(endpoints) == 1:
+            return endpoints
+        settings = self._settings()
+        now = time.time()
+        with self._lock:
+            scored = []
+            for position, endpoint in enumerate(endpoints):
+                summary = self._endpoint_stats(endpoint_key(endpoint)).summary()
+                cooling_down = (summary["consecutive_failures"] >= settings.get("max_consecutive_failures", 3)
+                                and now - summary["last_failure_at"] < settings.get("failure_cooldown_seconds", 60))
+                if summary["p95"] is None:
+                    # not measured yet -> explore it, only failures so far -> try it last
+                    score = float("inf") if summary["samples"] else 0.0
+                else:
+                    score = summary["p95"] * (1 + settings.get("error_rate_penalty", 4) * summary["error_rate"])
+                scored.append((cooling_down, score, position, endpoint))
+            scored.sort(key=lambda item: item[:3])
+            ordered = [item[3] for item in scored]
+            self._log_decision(model["name"], ordered, scored)
+        return ordered
+
+    def _log_decision(self, model_name: str, ordered: list, scored: list):
+        if self._decisions is None:
+            self._decisions = deque(maxlen=self._settings().get("decisions_log_size", 200))
+        self._decisions.append({
+            "timestamp": time.time(),
+            "model": model_name,
+            "order": [endpoint_key(endpoint) for endpoint in ordered],
+            "scores": {endpoint_key(endpoint): round(score, 3) if score != float("inf") else None for _, score, _, endpoint in scored},
+            "cooling_down": [endpoint_key(endpoint) for cooling_down, _, _, endpoint in scored if cooling_down]
+        })
+
+    def record(self, endpoint, latency: float, ok: bool):
+        """Records the outcome of one call to an endpoint."""
+        with self._lock:
+            self._endpoint_stats(endpoint_key(endpoint)).record(latency, ok)
+
+    def snapshot(self) -> dict:
+        """Returns per-endpoint stats (p50/p95, error rate, latency histogram) and recent routing decisions."""
+        with self._lock:
+            return {
+                "endpoints": {key: stats.summary() for key, stats in self._stats.items()},
+                "decisions": list(self._decisions or [])
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._decisions = None
+
+
+llm_router = LLMRouter()
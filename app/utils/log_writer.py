@@ -0,0 +1,137 @@
+# Background JSONL log writer.
+# Callers only enqueue a record; a daemon thread collects records into batches and appends
+# them to rotating JSONL segments (optionally gzip compressed), so logging never blocks
+# the request path with file I/O or pretty-printing.
+# The shared llm_log_writer reads llm_log_settings through the model registry whenever it starts
+# a batch or a segment, so reload_llm_config() applies changed settings.
+
+import os
+import sys
+import gzip
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime
+
+from app.configs.app_config import APP_SETTINGS
+from app.utils import model_registry
+
+
+class JsonlLogWriter:
+    def __init__(self, log_dir: str, file_prefix: str, settings=None):
+        """
+        Args:
+            log_dir (str): Folder of the segments, or a function returning it (called at use time).
+            file_prefix (str): Segment file name prefix.
+            settings (dict): Writer settings (see llm_log_settings in ai config), or a function returning them.
+        """
+        self._log_dir = log_dir
+        self.file_prefix = file_prefix
+        self._settings = settings or {}
+        self._queue: queue.Queue = queue.Queue()
+        self._segment_path = None
+        self._segment_bytes = 0
+        self._segment_started_at = 0.0
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def settings(self) -> dict:
+        return self._settings() if callable(self._settings) else self._settings
+
+    @property
+    def log_dir(self) -> str:
+        return self._log_dir() if callable(self._log_dir) else self._log_dir
+
+    def write(self, record: dict):
+        """Enqueues a record, it is written by the background thread."""
+        self._ensure_thread()
+        self._queue.put(record)
+
+    def flush(self, timeout: float = None):
+        """Blocks until all records enqueued so far are written."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=f"{self.file_prefix}_log_writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush, 5)
+
+    def _run(self):
+        pending = []  # records of failed batches, written again with the next one
+        while True:
+            settings = self.settings()
+            flush_interval_seconds = settings.get("flush_interval_seconds", 1)
+            try:
+                # with records pending, wake up to retry even if nothing new is logged
+                batch = [self._queue.get(timeout=flush_interval_seconds if pending else None)]
+            except queue.Empty:
+                batch = []
+            settings = self.settings()  # may have been reloaded while waiting
+            deadline = time.monotonic() + settings.get("flush_interval_seconds", 1)
+            while len(batch) < settings.get("batch_size", 100):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            records = pending + [item for item in batch if not isinstance(item, threading.Event)]
+            try:
+                if records:
+                    self._write_batch(records)
+                pending = []
+            except Exception as e:
+                pending = records[-settings.get("max_pending_records", 10000):]
+                dropped = len(records) - len(pending)
+                sys.stderr.write(f"*** Error writing log batch to {self.log_dir}: {e} "
+                                 f"({len(pending)} records kept for the next attempt{f', {dropped} oldest dropped' if dropped else ''})\n")
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write_batch(self, records: list):
+        lines = "".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records)
+        data = lines.encode("utf-8")
+        self._rotate_if_needed()
+        if self._segment_path.endswith(".gz"):
+            # every batch becomes one gzip member, concatenated members are a valid gzip file
+            with open(self._segment_path, "ab") as file:
+                file.write(gzip.compress(data))
+        else:
+            with open(self._segment_path, "ab") as file:
+                file.write(data)
+        self._segment_bytes += len(data)
+
+    def _rotate_if_needed(self):
+        now = time.time()
+        settings = self.settings()
+        log_dir = self.log_dir
+        extension = ".jsonl.gz" if settings.get("compress", False) else ".jsonl"
+        if (self._segment_path is not None
+                and os.path.dirname(self._segment_path) == log_dir
+                and self._segment_path.endswith(extension)
+                and self._segment_bytes < settings.get("segment_max_bytes", 5 * 1024 * 1024)
+                and now - self._segment_started_at < settings.get("segment_max_age_seconds", 24 * 3600)):
+            return
+        os.makedirs(log_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self._segment_path = os.path.join(log_dir, f"{self.file_prefix}_{timestamp}{extension}")
+        self._segment_bytes = 0
+        self._segment_started_at = now
+
+
+llm_log_writer = JsonlLogWriter(
+    log_dir=lambda: os.path.join(APP_SETTINGS.USER_DATA_FILES_PATH, model_registry.get_llm_registry().log_settings.get("dir", "logs")),
+    file_prefix="ai_responses",
+    settings=lambda: model_registry.get_llm_registry().log_settings
+)
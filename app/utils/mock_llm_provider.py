@@ -0,0 +1,161 @@
+# Local mock of an OpenAI compatible chat completions provider.
+# Providers with api_type "mock" use a base url like "mock://<provider name>/v1/chat/completions".
+# Every pooled HTTP session mounts MockLLMAdapter for the mock:// scheme, so requests never leave
+# the process but still go through the whole client stack (rate limiter, retries, streaming,
+# logging). Latency, token counts, streaming speed and injected errors are configured by the
+# provider's "mock" dict in ai config; a "seed" makes runs reproducible.
+
+import json
+import time
+import random
+import threading
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from app.utils import model_registry
+
+MOCK_URL_SCHEME = "mock://"
+
+default_mock_settings = {
+    "latency_seconds": {"min": 0.05, "max": 0.3},   # uniform, time until the (first byte of the) response
+    "latency_distribution": "uniform",              # "uniform", "normal" (mean/stddev of min..max) or "fixed" (min)
+    "completion_tokens": {"min": 20, "max": 200},
+    "tokens_per_second": 200,                       # streaming speed after the first chunk
+    "error_rate": 0.0,                              # share of requests answered with an injected error
+    "error_statuses": [429, 500, 503],
+    "retry_after_seconds": None,                    # Retry-After header sent with injected 429s
+    "seed": None,
+}
+
+_FILLER_WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit", "sed", "do", "eiusmod", "tempor")
+
+
+class _GeneratorReader:
+    """File-like object feeding a Response body from a generator of bytes (used as Response.raw)."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size=-1, **kwargs):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+            if size > 0 and self._buffer:
+                break  # return what is available, keeps streamed chunks flowing one by one
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        pass
+
+
+class MockLLMAdapter(BaseAdapter):
+    def __init__(self):
+        super().__init__()
+        self._randoms: dict[str, random.Random] = {}
+        self._lock = threading.Lock()
+
+    def _settings(self, provider_name: str) -> dict:
+        settings = dict(default_mock_settings)
+        provider = model_registry.get_llm_registry().get_provider(provider_name)
+        if provider:
+            settings.update(provider.get("mock") or {})
+        return settings
+
+    def _random(self, provider_name: str, settings: dict) -> random.Random:
+        # called with self._lock held
+        if provider_name not in self._randoms:
+            self._randoms[provider_name] = random.Random(settings.get("seed"))
+        return self._randoms[provider_name]
+
+    def _latency(self, rng: random.Random, settings: dict) -> float:
+        low, high = settings["latency_seconds"]["min"], settings["latency_seconds"]["max"]
+        distribution = settings.get("latency_distribution", "uniform")
+        if distribution == "fixed":
+            return low
+        if distribution == "normal":
+            return max(0.0, rng.gauss((low + high) / 2, (high - low) / 4))
+        return rng.uniform(low, high)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        provider_name = request.url[len(MOCK_URL_SCHEME):].split("/", 1)[0]
+        settings = self._settings(provider_name)
+        body = request.body.decode("utf-8") if isinstance(request.body, bytes) else (request.body or "{}")
+        payload = json.loads(body)
+
+        with self._lock:
+            rng = self._random(provider_name, settings)
+            latency = self._latency(rng, settings)
+            inject_error = rng.random() < settings["error_rate"]
+            error_status = rng.choice(settings["error_statuses"])
+            completion_tokens = rng.randint(settings["completion_tokens"]["min"], settings["completion_tokens"]["max"])
+
+        time.sleep(latency)
+        if inject_error:
+            headers = {"Content-Type": "application/json"}
+            if error_status == 429 and settings.get("retry_after_seconds") is not None:
+                headers["Retry-After"] = str(settings["retry_after_seconds"])
+            error_body = json.dumps({"error": {"message": "Mock provider injected error", "code": error_status}}).encode("utf-8")
+            return self._build_response(request, error_status, headers, [error_body])
+
+        completion = self._completion(payload, completion_tokens)
+        if payload.get("stream"):
+            chunks = self._stream_chunks(completion, settings)
+            return self._build_response(request, 200, {"Content-Type": "text/event-stream; charset=utf-8"}, chunks)
+        return self._build_response(request, 200, {"Content-Type": "application/json"}, [json.dumps(completion, ensure_ascii=False).encode("utf-8")])
+
+    def _completion(self, payload: dict, completion_tokens: int) -> dict:
+        messages = payload.get("messages") or []
+        prompt_text = " ".join(str(message.get("content", "")) for message in messages)
+        last_message = str(messages[-1].get("content", "")) if messages else ""
+        words = [f"Mock response to: {last_message[:60].strip()}"]
+        words += [_FILLER_WORDS[i % len(_FILLER_WORDS)] for i in range(completion_tokens)]
+        content = " ".join(words)
+        if (payload.get("response_format") or {}).get("type") == "json_object":
+            content = json.dumps({"mock": True, "content": content}, ensure_ascii=False)
+        prompt_tokens = len(prompt_text) // 4 + len(messages)
+        return {
+            "id": f"mock-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    def _stream_chunks(self, completion: dict, settings: dict):
+        token_delay = 1 / settings["tokens_per_second"] if settings.get("tokens_per_second") else 0
+        content = completion["choices"][0]["message"]["content"]
+        tokens = content.split(" ")
+        for index, token in enumerate(tokens):
+            if index and token_delay:
+                time.sleep(token_delay)
+            delta = {"content": token if index == 0 else " " + token}
+            if index == 0:
+                delta["role"] = "assistant"
+            chunk = {"id": completion["id"], "object": "chat.completion.chunk", "model": completion["model"], "choices": [{"index": 0, "delta": delta}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+        usage_chunk = {"id": completion["id"], "object": "chat.completion.chunk", "model": completion["model"], "choices": [], "usage": completion["usage"]}
+        yield f"data: {json.dumps(usage_chunk)}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+    def _build_response(self, request, status_code: int, headers: dict, chunks) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.raw = _GeneratorReader(chunks)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.reason = "OK" if status_code == 200 else "Mock error"
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,87 @@
+# Compiled registry of LLM models and providers.
+# Built once from app/configs/ai_config.py into read-only dicts, so lookups by model name
+# (or alias) and by provider name are O(1). Each provider carries a precomputed binding
+# (base url, api type, request headers) and each model its tuple of serving endpoints
+# (provider + model name at that provider). reload_llm_registry() re-reads the config module
+# and swaps the registry without restarting the server. The settings dicts (http, rate limits,
+# routing, cache, logging) are read through the current registry at use time, so a reload
+# applies them too.
+
+import importlib
+import threading
+from types import MappingProxyType
+
+from app.configs import ai_config
+
+
+class ModelRegistry:
+    def __init__(self, config_module):
+        providers = {}
+        for provider in config_module.llm_providers:
+            binding = dict(provider)
+            binding["headers"] = MappingProxyType({
+                "Authorization": f"Bearer {provider.get('api_key')}",
+                "Content-Type": "application/json"
+            })
+            providers[provider["name"]] = MappingProxyType(binding)
+
+        models = {}
+        aliases = {}
+        for model in config_module.llm_models:
+            if model.get("provider") not in providers:
+                raise Exception(f"Model '{model['name']}' uses unknown provider '{model.get('provider')}' in ai config")
+            endpoints = []
+            for endpoint in model.get("endpoints") or [{"provider": model["provider"]}]:
+                if endpoint.get("provider") not in providers:
+                    raise Exception(f"Model '{model['name']}' has an endpoint with unknown provider '{endpoint.get('provider')}' in ai config")
+                endpoints.append(MappingProxyType({
+                    "provider": endpoint["provider"],
+                    "model": endpoint.get("model", model["name"])
+                }))
+            entry = MappingProxyType({**model, "endpoints": tuple(endpoints)})
+            models[model["name"]] = entry
+            for alias in model.get("aliases", []):
+                aliases[alias] = entry
+
+        self.providers = MappingProxyType(providers)
+        self.models = MappingProxyType(models)
+        self._lookup = MappingProxyType({**aliases, **models})  # real names win over aliases
+        self.model_list = tuple(models.values())
+        self.http_settings = MappingProxyType(dict(config_module.llm_http_settings))
+        self.rate_limit_settings = MappingProxyType(dict(config_module.llm_rate_limit_settings))
+        self.routing_settings = MappingProxyType(dict(config_module.llm_routing_settings))
+        self.cache_settings = MappingProxyType(dict(config_module.llm_cache_settings))
+        self.log_settings = MappingProxyType(dict(config_module.llm_log_settings))
+
+    def get_model(self, model_name: str):
+        """Returns the model entry by name or alias, None if not found."""
+        return self._lookup.get(model_name)
+
+    def get_provider(self, provider_name: str):
+        """Returns the provider binding by name, None if not found."""
+        return self.providers.get(provider_name)
+
+    def get_model_binding(self, model_name: str) -> tuple:
+        """Returns (model, provider) for a model name or alias, (None, None) if not found."""
+        model = self._lookup.get(model_name)
+        if model is None:
+            return None, None
+        return model, self.providers[model["provider"]]
+
+
+llm_registry = ModelRegistry(ai_config)
+_reload_lock = threading.Lock()
+
+
+def get_llm_registry() -> ModelRegistry:
+    """Returns the current registry. Don't keep the reference, it is replaced on reload."""
+    return llm_registry
+
+
+def reload_llm_registry() -> ModelRegistry:
+    """Re-reads app/configs/ai_config.py and replaces the registry."""
+    global llm_registry
+    with _reload_lock:
+        config_module = importlib.reload(ai_config)
+        llm_registry = ModelRegistry(config_module)
+    return llm_registry
@@ -0,0 +1,167 @@
+# Provider-aware rate limiting and retries for LLM calls.
+# Token buckets (requests/min and tokens/min) are kept per provider, or per model if the
+# model has its own "rate_limits" in ai config. Failed calls (429, 5xx, connection errors)
+# are retried with jittered exponential backoff that honors the Retry-After header.
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from app.utils import model_registry
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1):
+        """Blocks until amount tokens are available and takes them."""
+        amount = min(amount, self.capacity)  # a single oversized request must not wait forever
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait_seconds = (amount - self.tokens) / self.refill_per_second
+            time.sleep(wait_seconds)
+
+    def debit(self, amount: float):
+        """Takes (or with negative amount returns) tokens without waiting, the balance may go below zero."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def get_rate_limit_settings(provider_name: str = None, model_name: str = None) -> tuple:
+    """Returns (bucket_key, settings) with provider and model overrides applied on top of the defaults."""
+    registry = model_registry.get_llm_registry()
+    settings = dict(registry.rate_limit_settings)
+    bucket_key = provider_name
+    provider = registry.get_provider(provider_name)
+    if provider:
+        settings.update(provider.get('rate_limits') or {})
+    model = registry.get_model(model_name)
+    if model and model.get('rate_limits'):
+        settings.update(model['rate_limits'])
+        bucket_key = f"{provider_name}/{model['name']}"
+    return bucket_key, settings
+
+
+class ProviderRateLimiter:
+    def __init__(self):
+        self._request_buckets: dict[str, TokenBucket] = {}
+        self._token_buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _buckets(self, bucket_key: str, settings: dict) -> tuple:
+        with self._lock:
+            if bucket_key not in self._request_buckets:
+                rpm = settings.get("requests_per_minute")
+                tpm = settings.get("tokens_per_minute")
+                self._request_buckets[bucket_key] = TokenBucket(rpm, rpm / 60) if rpm else None
+                self._token_buckets[bucket_key] = TokenBucket(tpm, tpm / 60) if tpm else None
+            return self._request_buckets[bucket_key], self._token_buckets[bucket_key]
+
+    def acquire(self, provider_name: str, model_name: str, estimated_tokens: int = 0):
+        """Blocks until the provider/model bucket allows one more request of estimated_tokens."""
+        bucket_key, settings = get_rate_limit_settings(provider_name, model_name)
+        request_bucket, token_bucket = self._buckets(bucket_key, settings)
+        if request_bucket:
+            request_bucket.acquire(1)
+        if token_bucket and estimated_tokens:
+            token_bucket.acquire(estimated_tokens)
+
+    def record_usage(self, provider_name: str, model_name: str, estimated_tokens: int, used_tokens: int):
+        """Corrects the tokens/min bucket by the difference between the estimate and the reported usage."""
+        if used_tokens is None:
+            return
+        bucket_key, settings = get_rate_limit_settings(provider_name, model_name)
+        _, token_bucket = self._buckets(bucket_key, settings)
+        if token_bucket:
+            token_bucket.debit(used_tokens - estimated_tokens)
+
+    def reset(self):
+        """Drops all buckets, e.g. after rate limits in ai config were changed."""
+        with self._lock:
+            self._request_buckets.clear()
+            self._token_buckets.clear()
+
+
+llm_rate_limiter = ProviderRateLimiter()
+
+
+def estimate_tokens(messages) -> int:
+    """Rough prompt size estimate (about 4 characters per token) used before the real usage is known."""
+    if isinstance(messages, str):
+        return len(messages) // 4 + 1
+    return sum(len(str(message.get("content", ""))) for message in messages) // 4 + len(messages)
+
+
+def retry_after_seconds(retry_after: str):
+    """Parses a Retry-After header value (seconds or HTTP date), returns None if missing or invalid."""
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int, settings: dict, retry_after: str = None) -> float:
+    """
+    Delay before the next attempt, a Retry-After sent by the provider wins over the jittered exponential backoff.
+    Both are capped by settings["backoff_max_seconds"].
+    """
+    delay = retry_after_seconds(retry_after)
+    if delay is not None:
+        return min(delay, settings["backoff_max_seconds"])
+    return random.uniform(0, min(settings["backoff_max_seconds"], settings["backoff_base_seconds"] * (2 ** attempt)))
+
+
+def send_with_rate_limit_and_retry(send, provider_name: str, model_name: str, estimated_tokens: int = 0) -> requests.Response:
+    """
+    Sends a request through the provider rate limiter and retries transient failures.
+    Args:
+        send (callable): Function without arguments performing the HTTP request and returning the response.
+        provider_name (str): Provider name from ai config.
+        model_name (str): Model name from ai config.
+        estimated_tokens (int): Estimated prompt tokens for the tokens/min bucket, taken once (not again on retries).
+    Returns:
+        requests.Response: The first non-retryable response, or the last one when retries are exhausted.
+    Raises:
+        requests.ConnectionError, requests.Timeout: When retries are exhausted on connection problems.
+    """
+    _, settings = get_rate_limit_settings(provider_name, model_name)
+    max_retries = settings["max_retries"]
+    for attempt in range(max_retries + 1):
+        # every attempt is a request, but the prompt tokens of the logical request are taken only once
+        llm_rate_limiter.acquire(provider_name, model_name, estimated_tokens if attempt == 0 else 0)
+        try:
+            response = send()
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= max_retries:
+                raise
+            time.sleep(backoff_seconds(attempt, settings))
+            continue
+        if response.status_code not in settings["retry_statuses"] or attempt >= max_retries:
+            return response
+        delay = backoff_seconds(attempt, settings, response.headers.get("Retry-After"))
+        response.close()
+        time.sleep(delay)
@@ -16,6 +16,8 @@ class ResponseAction(str, Enum):
     INTERACTION_REQUEST = "interaction_request"
     DATA_UPDATED = "data_updated"
     STATUS_MESSAGE = "status_message"
+    CONTENT_DELTA = "content_delta"
+    TASK_CREATED = "task_created"
 
 class ResponseKey(str, Enum):
     STATUS = "status"
@@ -1,15 +1,53 @@
 # SSE (Server-Sent Events) queue management for task status updates.
 # This module provides functionality to manage Server-Sent Events (SSE) queues for tasks.
+# A task's queue is created by /api/start_task and read by /msg/stream. Streamed LLM deltas are
+# only enqueued while a reader is connected, and the queue is removed when the task ends (or,
+# if a reader is connected then, once it has read everything).
 
 import queue
 import time
-from app.utils.response_types import ResponseKey
+import threading
+from app.utils.response_types import ResponseKey, ResponseAction
 
 all_task_sse_queues: dict[str, queue.Queue] = {}
+task_sse_readers: dict[str, int] = {}  # task id -> number of connected /msg/stream readers
+_task_sse_lock = threading.Lock()
 
-def put_msg_to_task_sse_queue(task_id: str, msgTitle: str = None, msgBody: str = None, message: dict = None):
-    """Helper to enqueue a status message for SSE streaming."""
+
+def attach_task_sse_reader(task_id: str):
+    with _task_sse_lock:
+        task_sse_readers[task_id] = task_sse_readers.get(task_id, 0) + 1
+
+
+def detach_task_sse_reader(task_id: str, finished: bool = False):
+    """Called when a reader disconnects; finished=True if it read the end of the task, then the queue goes too."""
+    with _task_sse_lock:
+        readers = task_sse_readers.get(task_id, 1) - 1
+        if readers > 0:
+            task_sse_readers[task_id] = readers
+        else:
+            task_sse_readers.pop(task_id, None)
+        if finished:
+            all_task_sse_queues.pop(task_id, None)
+
+
+def close_task_sse_queue(task_id: str):
+    """Ends the task's SSE stream: connected readers get the end marker, without readers the queue is dropped."""
+    with _task_sse_lock:
+        task_sse_queue = all_task_sse_queues.get(task_id)
+        if task_sse_queue is None:
+            return
+        if task_sse_readers.get(task_id):
+            task_sse_queue.put(None)
+        else:
+            all_task_sse_queues.pop(task_id, None)
+
+
+def put_msg_to_task_sse_queue(task_id: str, msgTitle: str = None, msgBody: str = None, message: dict = None, action: str = None):
+    """Helper to enqueue a status message for SSE streaming. Optional action overrides the default status_message action."""
     task_sse_queue = all_task_sse_queues.get(task_id)
+    if action == ResponseAction.CONTENT_DELTA and not task_sse_readers.get(task_id):
+        return  # nobody shows the deltas, the final response carries the whole content
     if task_sse_queue:
         task_sse_item = {
             ResponseKey.TASK_ID: task_id,
@@ -19,6 +57,8 @@ def put_msg_to_task_sse_queue(task_id: str, msgTitle: str = None, msgBody: str =
                 ResponseKey.BODY: msgBody
             }
         }
+        if action:
+            task_sse_item[ResponseKey.ACTION] = action
         task_sse_queue.put(task_sse_item)
 
 # Example usage:
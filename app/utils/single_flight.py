@@ -0,0 +1,63 @@
+# Single-flight deduplication of concurrent identical calls.
+# While a call for a key is in flight, other threads asking for the same key wait
+# for it and receive a copy of its result instead of repeating the work.
+
+import copy
+import threading
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func):
+        """
+        Runs func() once for all concurrent callers with the same key.
+        Args:
+            key (str): Identity of the call, e.g. llm_request_key(...).
+            func (callable): Function without arguments doing the actual work.
+        Returns:
+            The result of func(), waiting callers get a deep copy of it.
+        Raises:
+            The exception raised by func(), for the caller and all waiters.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not is_leader:
+            call.done.wait()
+            if isinstance(call.error, Exception):
+                raise call.error
+            if call.error is not None:
+                # KeyboardInterrupt, SystemExit, ... stop the leader's thread only, the waiters get an error
+                raise Exception(f"The shared call was interrupted ({type(call.error).__name__}).")
+            return copy.deepcopy(call.result)
+
+        try:
+            result = func()
+            call.result = copy.deepcopy(result) # snapshot, the leader may modify its own result
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Returns the number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,44 @@
+// DOM elements
+const domFileContent = document.getElementById('fileContent');
+const domButtonLoadMore = document.getElementById('buttonLoadMore');
+const domFileLoadInfo = document.getElementById('fileLoadInfo');
+
+// state
+let loaded = domFileContent ? Number(domFileContent.dataset.loaded) : 0;
+// ETag of the file as rendered, later chunks are only ranges of that same version
+let etag = domFileContent ? domFileContent.dataset.etag : null;
+// keeps a character split between two chunks until the next one arrives
+const decoder = new TextDecoder('utf-8');
+
+
+// functions
+async function loadMore() {
+    const size = Number(domFileContent.dataset.size);
+    const chunkSize = Number(domFileContent.dataset.chunkSize);
+    const headers = { 'Range': `bytes=${loaded}-${loaded + chunkSize - 1}` };
+    // if the file changed since the page was rendered, the server answers with the whole file (200) instead of a range
+    if (etag) headers['If-Range'] = etag;
+    domButtonLoadMore.disabled = true;
+    try {
+        const response = await fetch(domFileContent.dataset.url, { headers, cache: 'no-store' });
+        if (response.status !== 206) {
+            window.location.reload();
+            return;
+        }
+        const data = new Uint8Array(await response.arrayBuffer());
+        loaded += data.length;
+        const done = loaded >= size || data.length === 0;
+        domFileContent.textContent += decoder.decode(data, { stream: !done });
+        if (done) {
+            domButtonLoadMore.parentElement.remove();
+            return;
+        }
+        domFileLoadInfo.textContent = `${loaded} of ${size} bytes`;
+    } catch (error) {
+        console.log('loadMore - error:', error);
+    }
+    domButtonLoadMore.disabled = false;
+}
+
+// Event listeners
+if (domButtonLoadMore) domButtonLoadMore.addEventListener('click', loadMore);
@@ -33,7 +33,7 @@ async function startWorkflow() {
         payload.model = domModelSelect.value;
     }
     console.log('startWorkflow - payload:', payload);
-    // 1) Start the workflow (runs until first yield)
+    // 1) Create the task (the workflow doesn't run yet)
     const res = await fetch('/api/start_task', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
@@ -42,23 +42,38 @@ async function startWorkflow() {
     const data = await res.json();
     taskId = data.task_id;
     console.log('startWorkflow - response:', data);
+    if (data.action !== 'task_created') {
+        // error, or a workflow that isn't a generator and already finished
+        handleMsg(data);
+        return;
+    }
 
-    
-    /* temporary disabled SSE
-    // 2) Open SSE stream for status updates
-    SSE = new EventSource(`/msg/stream?task_id=${taskId}`);
-    SSE.onmessage = e => {
-        const msg = JSON.parse(e.data);
-        console.log('SSE message:', msg);
-        handleMsg(msg);
-    };
-    SSE.onerror = (error) => console.error('SSE error', error);    
-    */
+    // 2) Open SSE stream for status updates and streamed content
+    await openTaskStream(taskId);
 
-    // 3) Handle the initial response
-    handleMsg(data);
+    // 3) Run the workflow until its first yield
+    continueWorkflow(null);
 };
 
+function openTaskStream(id) {
+    // resolves once the stream is connected, so no streamed output is missed
+    return new Promise(resolve => {
+        SSE = new EventSource(`/msg/stream?task_id=${id}`);
+        SSE.onopen = () => resolve();
+        SSE.onmessage = e => {
+            const msg = JSON.parse(e.data);
+            console.log('SSE message:', msg);
+            handleMsg(msg);
+        };
+        SSE.onerror = (error) => {
+            console.error('SSE error', error);
+            // the server ends the stream when the task is done, don't reconnect
+            SSE.close();
+            resolve();
+        };
+    });
+}
+
 async function continueWorkflow(input) {
     const res = await fetch('/api/continue_task', {
         method: 'POST',
@@ -249,6 +264,16 @@ function handleMsg(response) {
             });
             break;
 
+        case 'content_delta':
+            // streamed LLM tokens are appended to one live message per task
+            let domStreamedContent = document.getElementById(`streamed-content-${response.task_id}`);
+            if (!domStreamedContent) {
+                domResponses.innerHTML += `<div class="message"><pre id="streamed-content-${response.task_id}"></pre></div>`;
+                domStreamedContent = document.getElementById(`streamed-content-${response.task_id}`);
+            }
+            domStreamedContent.textContent += response.message.body;
+            break;
+
         default:
             processFuncLog(response);
             domResponses.innerHTML += renderMessageComponent({
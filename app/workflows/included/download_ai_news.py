@@ -1,5 +1,5 @@
 from app.workflows.core import workflow, Workflow
-from app.tools.included import download_news_newsapi, save_to_file, json_db_add_entry, user_data_files_path
+from app.tools.included import download_news_newsapi, save_to_file, json_db_add_entries, user_data_files_path
 import json
 
 @workflow()
@@ -14,11 +14,10 @@ def download_ai_news():
         
         file_path = user_data_files_path("news.md")
         db_file_path = user_data_files_path("databases/news.json")
+        json_db_add_entries(db_filepath=db_file_path, collection="entries", entries=articles, add_createdat=False)
+
         for article in articles:
             article_readable = json.dumps(article, indent=2, ensure_ascii=False)
-            
-            json_db_add_entry(db_filepath=db_file_path, collection="entries", entry=article, add_createdat=False)
-            
             save_file_result = save_to_file(file_path, article_readable + "\n\n-----\n", prepend=True)
             wf.log_msg(msg=save_file_result["message"])
 
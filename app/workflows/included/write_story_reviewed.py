@@ -8,7 +8,7 @@ def write_story_reviewed(input, task_id, model="openai/gpt-4.1"):
     try:
         wf = Workflow(task_id=task_id)
         # step 1: Generate the story
-        story = wf.get_assistant_output_or_raise(writer(input=input.strip(), model=model))
+        story = wf.get_assistant_output_or_raise(writer(input=input.strip(), model=model, task_id=task_id))
 
         wf.log_msg(msgTitle="LLM: Story generated", msgBody=str(story))
 
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, jsonify, Response, abort, redirect, url_for
+from flask import Flask, render_template, request, jsonify, Response, abort, redirect, url_for, send_file
 from flask_cors import CORS
 
 import uuid
@@ -7,13 +7,17 @@ import queue
 from dotenv import load_dotenv
 import os
 import time
+import codecs
+import zlib
+from werkzeug.http import quote_etag
 
 from app.workflows.core import WORKFLOWS_REGISTRY
-from app.utils.shared import all_task_sse_queues
+from app.utils.shared import all_task_sse_queues, attach_task_sse_reader, detach_task_sse_reader, close_task_sse_queue
 from app.utils.response_types import response_output_error, response_output_success, ResponseAction, ResponseKey, ResponseStatus
 from app.storage.manager import FileStorageManager
-from app.configs.app_config import APP_SETTINGS
-from app.configs.ai_config import llm_models
+from app.storage.json_db import SIDECAR_FOLDER as JSON_DB_SIDECAR_FOLDER
+from app.configs.app_config import APP_SETTINGS, FILE_STORAGE_SETTINGS
+from app.utils.model_registry import get_llm_registry
 
 # ----------------------
 # Flask app setup
@@ -36,7 +40,12 @@ wf_registry = WORKFLOWS_REGISTRY
 
 # File storage manager
 FILES_FOLDER = APP_SETTINGS.USER_DATA_PATH
-file_manager = FileStorageManager(base_path=FILES_FOLDER, skip_folders=["__pycache__"])
+file_manager = FileStorageManager(base_path=FILES_FOLDER, skip_folders=["__pycache__", JSON_DB_SIDECAR_FOLDER], lazy=True)
+
+def file_etag(stat_result, full_path):
+    """ETag of a stored file, the detail page renders the same value files_file_content sends."""
+    return f"{stat_result.st_mtime}-{stat_result.st_size}-{zlib.adler32(full_path.encode('utf-8'))}"
+
 
 @app.template_filter('active_page')
 def active_page(current_page, page_name):
@@ -50,7 +59,7 @@ def page_index():
 
 @app.route('/workflows')
 def page_workflows():
-    return render_template('workflows.html', workflows=wf_registry, llm_models=llm_models)
+    return render_template('workflows.html', workflows=wf_registry, llm_models=get_llm_registry().model_list)
 
 @app.route('/test')
 def page_test():
@@ -62,17 +71,24 @@ def status_stream():
     task_status_queue = all_task_sse_queues.get(task_id) # Get the queue for this task_id
     if not task_status_queue:
         return "", 404
+    attach_task_sse_reader(task_id)
     def event_stream():
-        while True:
-            task_status_item = task_status_queue.get() # block until next status or None
-            if task_status_item is None:
-                break # generator finished
-            payload = response_output_success({
-                ResponseKey.ACTION: ResponseAction.STATUS_MESSAGE, 
-                ResponseKey.CATEGORY: "workflow", 
-                **task_status_item
-                })
-            yield f"data: {json.dumps(payload)}\n\n"
+        finished = False
+        try:
+            yield ": connected\n\n" # sends the headers now, the client starts the task on open
+            while True:
+                task_status_item = task_status_queue.get() # block until next status or None
+                if task_status_item is None:
+                    finished = True
+                    break # generator finished
+                payload = response_output_success({
+                    ResponseKey.ACTION: ResponseAction.STATUS_MESSAGE, 
+                    ResponseKey.CATEGORY: "workflow", 
+                    **task_status_item
+                    })
+                yield f"data: {json.dumps(payload)}\n\n"
+        finally:
+            detach_task_sse_reader(task_id, finished=finished)
     return Response(event_stream(), mimetype="text/event-stream")
 
 # redirect to handle the trailing slash issue
@@ -83,68 +99,90 @@ def files_with_slash():
 @app.route('/files')
 @app.route('/files/folder/<item_id>')
 def files(item_id=None):
-    structure = file_manager.get_structure()
-    items_list = structure['items']
-    
     # Get current folder and build breadcrumb path
     current_folder = None
     breadcrumbs = []
     
     if item_id:
-        current_folder = next((item for item in items_list if item.id == item_id), None)
+        current_folder = file_manager.get_item(item_id, path=request.args.get('path'))
         if not current_folder or current_folder.type != 'folder':
             abort(404)
-            
-        # Build breadcrumbs
-        temp_folder = current_folder
-        while hasattr(temp_folder, 'parent'):
-            parent = next((item for item in items_list if item.id == temp_folder.parent), None)
-            if parent:
-                breadcrumbs.insert(0, parent)
-                temp_folder = parent
-            else:
-                break
-        breadcrumbs.append(current_folder)
-    
-    # Filter items for current folder
-    filtered_items = [
-        item for item in items_list 
-        if (not item_id and not hasattr(item, 'parent')) or
-           (hasattr(item, 'parent') and item.parent == item_id)
-    ]
+        breadcrumbs = file_manager.ancestors(item_id) + [current_folder]
+
+    # One page of the folder's items, next pages are addressed by cursor
+    cursor = request.args.get('cursor')
+    try:
+        page = file_manager.list_children(item_id, limit=FILE_STORAGE_SETTINGS.PAGE_SIZE, cursor=cursor)
+    except Exception:
+        abort(400)
     
     return render_template('files.html', 
-                         items=filtered_items, 
+                         items=page['items'], 
+                         total_items=page['total'],
+                         next_cursor=page['next_cursor'],
+                         is_first_page=not cursor,
                          current_folder=current_folder,
                          breadcrumbs=breadcrumbs)
 
 
 @app.route('/files/file/<item_id>')
 def files_file_detail(item_id):
-    structure = file_manager.get_structure()
-    item = next((item for item in structure['items'] if item.id == item_id), None)
+    item = file_manager.get_item(item_id, path=request.args.get('path'))
     
     if not item or item.type != 'file':
         abort(404)
     
-    # Generate breadcrumbs by traversing up through parent folders
-    breadcrumbs = []
-    if not hasattr(item, 'parent'):
+    # Breadcrumbs are the parent folders, from the top-level one down
+    breadcrumbs = file_manager.ancestors(item_id)
+    if item.parent_id is None:
         # If item has no parent, it's in the root folder
         breadcrumbs = [{'id': None, 'name': 'root', 'type': 'folder'}]
-    else:
-        current = next((i for i in structure['items'] if i.id == item.parent), None)
-        while current:
-            breadcrumbs.insert(0, current)
-            current = next((i for i in structure['items'] if i.id == current.parent), None) if hasattr(current, 'parent') else None
 
+    # Only the start of the file is rendered, the page loads the rest from files_file_content in chunks
     try:
         full_path = os.path.join(FILES_FOLDER, item.file_path)
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return render_template('files_file_detail.html', item=item, content=content, breadcrumbs=breadcrumbs)
-    except Exception as e:
+        with open(full_path, 'rb') as f:
+            stat_result = os.fstat(f.fileno())
+            size = stat_result.st_size
+            data = f.read(FILE_STORAGE_SETTINGS.PREVIEW_SIZE)
+    except FileNotFoundError:
+        abort(404)
+    except OSError as e:
+        app.logger.error(f"Can't read {full_path}: {e}")
         abort(500)
+    # a character cut at the end of the chunk is left for the next one
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    content = decoder.decode(data, final=len(data) >= size)
+    loaded = len(data) - len(decoder.getstate()[0])
+    # "Load more" sends it as If-Range, a file changed since this render comes back whole (200)
+    etag = quote_etag(file_etag(stat_result, full_path))
+    return render_template('files_file_detail.html', item=item, content=content, loaded=loaded, size=size, etag=etag,
+                           chunk_size=FILE_STORAGE_SETTINGS.PREVIEW_SIZE, breadcrumbs=breadcrumbs)
+
+
+@app.route('/files/file/<item_id>/content')
+def files_file_content(item_id):
+    """
+    Streams the file's bytes (?download=1 as an attachment).
+    send_file answers Range requests (206) and conditional requests (ETag, Last-Modified -> 304), and
+    hands the file to the server's wsgi.file_wrapper, which uses sendfile where the server supports it.
+    """
+    item = file_manager.get_item(item_id, path=request.args.get('path'))
+    if not item or item.type != 'file':
+        abort(404)
+    full_path = os.path.join(FILES_FOLDER, item.file_path)
+    try:
+        stat_result = os.stat(full_path)
+    except OSError:
+        abort(404)
+    if not os.path.isfile(full_path):
+        abort(404)
+    return send_file(full_path,
+                     as_attachment=request.args.get('download') == '1',
+                     download_name=item.title,
+                     conditional=True,
+                     etag=file_etag(stat_result, full_path),
+                     max_age=0)
 
 
 # -------------------------------
@@ -156,7 +194,6 @@ def start_task():
     try:
         import inspect
         task_id = str(uuid.uuid4())
-        all_task_sse_queues[task_id] = queue.Queue()
         data = request.json
         if not data or 'workflow_id' not in data:
             return jsonify(response_output_error({
@@ -186,21 +223,25 @@ def start_task():
             kwargs['model'] = data.get('model')
         # Always include task_id
         kwargs['task_id'] = task_id
+        all_task_sse_queues[task_id] = queue.Queue()
                 
         generator_func = workflow['function'](**kwargs)
-        generators[task_id] = generator_func
-        
-        #response_from_generator = next(generator_func)
 
         # Check if the result is a generator
         if hasattr(generator_func, '__iter__') and hasattr(generator_func, '__next__'):
-            # Kick off the generator until first yield
-            response_from_generator = next(generator_func)
-        else:
-            # If it's not a generator, use the return value directly
-            response_from_generator = generator_func
-        return jsonify({"task_id": task_id, "timestamp": time.time(), **response_from_generator})        
+            # Not started yet: the client opens /msg/stream first and then runs the generator
+            # until its first yield with /api/continue_task, so streamed output reaches it live
+            generators[task_id] = generator_func
+            return jsonify(response_output_success({
+                ResponseKey.TASK_ID: task_id,
+                ResponseKey.ACTION: ResponseAction.TASK_CREATED,
+                ResponseKey.MESSAGE: {ResponseKey.TITLE: "Task created", ResponseKey.BODY: workflow_id}
+                }))
+        # If it's not a generator, the workflow already ran, use the return value directly
+        close_task_sse_queue(task_id)
+        return jsonify({"task_id": task_id, "timestamp": time.time(), **generator_func})        
     except Exception as e:
+        close_task_sse_queue(task_id)
         return jsonify(response_output_error({ResponseKey.ERROR: str(e)})), 500
     
 
@@ -212,13 +253,18 @@ def continue_task():
     if not generator_func:
         return jsonify(response_output_error({ResponseKey.ERROR: "[continue_task()]: unknown task_id. Probably the workflow func incorrectly works with task_id"})), 400
     try:
-        continue_generator = generator_func.send(data.get("user_input")) # .send() will resume the generator
+        # .send() will resume the generator (or start it, the first call sends None)
+        continue_generator = generator_func.send(data.get("user_input"))
         return jsonify(continue_generator)
     except StopIteration as e:
         # Signal SSE stream to close
-        all_task_sse_queues[task_id].put(None)
+        close_task_sse_queue(task_id)
         generators.pop(task_id, None)        
         return jsonify(getattr(e, "value", None) or {})
+    except Exception as e:
+        close_task_sse_queue(task_id)
+        generators.pop(task_id, None)
+        return jsonify(response_output_error({ResponseKey.ERROR: str(e), ResponseKey.TASK_ID: task_id})), 500
 
 
 @app.route('/api/tools/test', methods=['POST'])
@@ -255,6 +301,50 @@ def test():
         }), 500
 
     
+@app.route('/api/llm_routing_stats')
+def llm_routing_stats():
+    from app.tools.included import get_llm_routing_stats
+    return jsonify(response_output_success({ResponseKey.DATA: get_llm_routing_stats()}))
+
+
+@app.route('/api/files/children')
+def files_children():
+    """One page of a folder's items (folder_id omitted for the root, path = its file_path), see FileStorageManager.list_children."""
+    folder_id = request.args.get('folder_id') or None
+    folder = file_manager.get_item(folder_id, path=request.args.get('path')) if folder_id else None
+    if folder_id and (folder is None or folder.type != 'folder'):
+        return jsonify(response_output_error({ResponseKey.ERROR: "Folder not found."})), 404
+    try:
+        limit = min(int(request.args.get('limit', FILE_STORAGE_SETTINGS.PAGE_SIZE)), FILE_STORAGE_SETTINGS.PAGE_SIZE)
+        page = file_manager.list_children(folder_id, limit=limit, cursor=request.args.get('cursor'))
+    except Exception as e:
+        return jsonify(response_output_error({ResponseKey.ERROR: str(e)})), 400
+    return jsonify(response_output_success({
+        ResponseKey.DATA: {
+            'items': [item.to_dict() for item in page['items']],
+            'total': page['total'],
+            'next_cursor': page['next_cursor']
+        },
+        ResponseKey.MESSAGE: {ResponseKey.TITLE: "Files", ResponseKey.BODY: f"{len(page['items'])} of {page['total']} items"}
+    }))
+
+
+@app.route('/api/reload_ai_config', methods=['POST'])
+def reload_ai_config():
+    try:
+        from app.tools.included import reload_llm_config
+        return jsonify(reload_llm_config())
+    except Exception as e:
+        return jsonify({
+            ResponseKey.STATUS: ResponseStatus.ERROR, 
+            ResponseKey.ERROR: str(e),
+            ResponseKey.MESSAGE: {
+                ResponseKey.TITLE: "Error: AI config not reloaded",
+                ResponseKey.BODY: f"Error: {str(e)}"
+            } 
+        }), 500
+
+
 @app.route('/api/reload_custom_workflows', methods=['POST'])
 def reload_custom_workflows():
     try:
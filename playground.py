@@ -325,8 +325,7 @@ def testingConvertTxtToDb_logbook():
   data_file = open_file(filepath=user_data_files_path("logbook.md"))
   data_parsed = [json.loads(d.strip()) for d in data_file.split("-----") if d.strip()]
   print(f"data: {json.dumps(data_parsed, indent=2, ensure_ascii=False)}", end="\n\n")
-  for item in reversed(data_parsed):
-    json_db_add_entry(db_filepath=user_data_files_path("databases/logbook.json"), collection="entries", entry=item, add_createdat=True)
+  json_db_add_entries(db_filepath=user_data_files_path("databases/logbook.json"), collection="entries", entries=list(reversed(data_parsed)), add_createdat=True)
 
 
 def testingConvertTxtToDb_vocabulary():
@@ -337,8 +336,7 @@ def testingConvertTxtToDb_vocabulary():
   end_index = len(data_parsed)
   data_fragment = data_parsed[start_index:end_index]
   print(f"data: {json.dumps(data_fragment, indent=2, ensure_ascii=False)}", end="\n\n")
-  for item in reversed(data_fragment):
-    json_db_add_entry(db_filepath=user_data_files_path(f"databases/{file_name}.json"), collection="entries", entry=item, add_createdat=True)
+  json_db_add_entries(db_filepath=user_data_files_path(f"databases/{file_name}.json"), collection="entries", entries=list(reversed(data_fragment)), add_createdat=True)
 
 
 def testingConvertTxtToDb_stories():
@@ -349,6 +347,7 @@ def testingConvertTxtToDb_stories():
   start_index = 0
   end_index = len(data_parsed)
   data_fragment = data_parsed[start_index:end_index]
+  items = []
   for item in reversed(data_fragment):
     if data_item_format == "json":
       item = json.loads(item.strip())
@@ -357,7 +356,8 @@ def testingConvertTxtToDb_stories():
         "content": item.strip()
       }
     print(f"{json.dumps(item, indent=2, ensure_ascii=False)}", end="\n\n")
-    json_db_add_entry(db_filepath=user_data_files_path(f"databases/{file_name}.json"), collection="entries", entry=item, add_createdat=True)
+    items.append(item)
+  json_db_add_entries(db_filepath=user_data_files_path(f"databases/{file_name}.json"), collection="entries", entries=items, add_createdat=True)
   
 
 def testingConvertTxtToDb_news():